@@ -0,0 +1,184 @@
+"""
+Shared Browser Pool
+One Chrome process hosting an isolated CDP browser context per account (opt-in via CHROME_SHARED_BROWSER)
+"""
+import json
+import time
+import shutil
+import socket
+import logging
+import tempfile
+import threading
+import subprocess
+import urllib.request
+import websocket
+from config import env_flag, env_int
+
+logger = logging.getLogger(__name__)
+
+STARTUP_TIMEOUT = 20
+# Seconds an account waits for a free browser context before giving up
+CONTEXT_SLOT_TIMEOUT = 120
+
+
+def is_shared_browser_enabled() -> bool:
+    """Check if accounts should share one Chrome process"""
+    return env_flag('CHROME_SHARED_BROWSER')
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class SharedBrowser:
+    """
+    Chrome process exposing the DevTools protocol on a local port
+
+    Each account gets its own browser context (separate cookie jar, cache
+    and storage), created through the browser-level DevTools endpoint.
+    """
+
+    def __init__(self, chrome_path: str, arguments: list):
+        self.chrome_path = chrome_path
+        self.arguments = arguments
+        self.port = None
+        self.process = None
+        self.profile_dir = None
+        self._ws_url = None
+        self._ws = None
+        self._message_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def debugger_address(self) -> str:
+        return f'127.0.0.1:{self.port}'
+
+    def start(self):
+        """Launch Chrome and wait for the DevTools endpoint"""
+        self.port = _free_port()
+        self.profile_dir = tempfile.mkdtemp(prefix='chrome-shared-', dir='/tmp')
+        command = [
+            self.chrome_path,
+            *self.arguments,
+            f'--remote-debugging-port={self.port}',
+            f'--user-data-dir={self.profile_dir}',
+            f'--disk-cache-dir={self.profile_dir}/cache',
+            'about:blank',
+        ]
+        logger.info(f"Starting shared Chrome on port {self.port}")
+        self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.time() + STARTUP_TIMEOUT
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Shared Chrome exited with code {self.process.returncode}")
+            try:
+                with urllib.request.urlopen(f'http://{self.debugger_address}/json/version', timeout=2) as response:
+                    self._ws_url = json.loads(response.read())['webSocketDebuggerUrl']
+                    return
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"Shared Chrome did not start within {STARTUP_TIMEOUT}s")
+
+    def is_alive(self) -> bool:
+        """Check the Chrome process and its DevTools endpoint"""
+        if self.process is None or self.process.poll() is not None:
+            return False
+        try:
+            self.send('Browser.getVersion')
+            return True
+        except Exception:
+            return False
+
+    def send(self, method: str, params: dict = None) -> dict:
+        """Send a browser-level DevTools command and return its result"""
+        with self._lock:
+            if self._ws is None:
+                self._ws = websocket.create_connection(self._ws_url, timeout=30, suppress_origin=True)
+            self._message_id += 1
+            message_id = self._message_id
+            self._ws.send(json.dumps({'id': message_id, 'method': method, 'params': params or {}}))
+            while True:
+                message = json.loads(self._ws.recv())
+                if message.get('id') != message_id:
+                    continue  # events
+                if 'error' in message:
+                    raise RuntimeError(f"{method} failed: {message['error'].get('message')}")
+                return message.get('result', {})
+
+    def create_context(self) -> tuple:
+        """
+        Create an isolated browser context with one blank page
+
+        Returns:
+            tuple of (browser_context_id, target_id)
+        """
+        context_id = self.send('Target.createBrowserContext', {'disposeOnDetach': False})['browserContextId']
+        target_id = self.send('Target.createTarget', {'url': 'about:blank', 'browserContextId': context_id})['targetId']
+        return context_id, target_id
+
+    def dispose_context(self, context_id: str):
+        """Close every page of a browser context and drop its data"""
+        try:
+            self.send('Target.disposeBrowserContext', {'browserContextId': context_id})
+        except Exception as e:
+            logger.warning(f"Failed to dispose browser context {context_id}: {e}")
+
+    def stop(self):
+        """Terminate Chrome and remove its profile"""
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+            self._ws = None
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+
+# Singleton browser reused by all accounts and warm invocations; it is only
+# restarted when unhealthy and otherwise lives as long as the container
+_browser = None
+_browser_lock = threading.Lock()
+_context_slots = None
+
+
+def get_shared_browser(chrome_path: str, arguments: list) -> SharedBrowser:
+    """Get the running shared browser, (re)starting it if it is not healthy"""
+    global _browser
+    with _browser_lock:
+        if _browser is not None and not _browser.is_alive():
+            logger.warning("Shared Chrome is not healthy, restarting")
+            _browser.stop()
+            _browser = None
+        if _browser is None:
+            browser = SharedBrowser(chrome_path, arguments)
+            browser.start()
+            _browser = browser
+        return _browser
+
+
+def get_running_browser():
+    """The shared browser if one was started, without starting it"""
+    return _browser
+
+
+def get_context_slots() -> threading.Semaphore:
+    """Semaphore bounding open browser contexts (MAX_BROWSER_CONTEXTS, default: 4)"""
+    global _context_slots
+    with _browser_lock:
+        if _context_slots is None:
+            _context_slots = threading.BoundedSemaphore(env_int('MAX_BROWSER_CONTEXTS', 4, minimum=1))
+        return _context_slots
+
@@ -0,0 +1,38 @@
+"""
+Config
+Shared constants and environment variable parsing
+"""
+import os
+from datetime import timedelta, timezone
+
+# dhlottery.co.kr draw schedules and weekly partitions are in Korea Standard Time
+KST = timezone(timedelta(hours=9))
+
+
+def env_int(name: str, default: int, minimum: int = None, maximum: int = None) -> int:
+    """Integer environment variable clamped to [minimum, maximum] (default if unset or invalid)"""
+    try:
+        value = int(os.environ.get(name, default))
+    except ValueError:
+        return default
+    if minimum is not None:
+        value = max(minimum, value)
+    if maximum is not None:
+        value = min(maximum, value)
+    return value
+
+
+def env_float(name: str, default: float, minimum: float = None) -> float:
+    """Float environment variable with an optional lower bound (default if unset or invalid)"""
+    try:
+        value = float(os.environ.get(name, default))
+    except ValueError:
+        return default
+    if minimum is not None:
+        value = max(minimum, value)
+    return value
+
+
+def env_flag(name: str) -> bool:
+    """Boolean environment variable ('1', 'true' or 'yes' enable it)"""
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes')
@@ -0,0 +1,162 @@
+"""
+Lotto 6/45 Draw Results
+Fetches official draw results once per round and matches tickets locally
+"""
+import os
+import json
+import logging
+import threading
+import urllib.request
+from datetime import datetime
+from config import KST
+from throttle import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+DRAW_API_URL = 'https://www.dhlottery.co.kr/common.do?method=getLottoNumber&drwNo={round}'
+CACHE_DIR = '/tmp/lotto-draws'
+
+# Round 1 was drawn on 2002-12-07 (Saturday) at about 20:45 KST
+FIRST_DRAW = datetime(2002, 12, 7, 20, 45, tzinfo=KST)
+
+# Fixed prizes (KRW); 1st-3rd are pari-mutuel
+FIXED_PRIZES = {4: 50000, 5: 5000}
+
+# Parsed draw results of this container, keyed by round
+_draws = {}
+_draws_lock = threading.Lock()
+
+
+def latest_drawn_round(now: datetime = None) -> int:
+    """Round number of the most recent draw"""
+    now = now or datetime.now(KST)
+    return (now - FIRST_DRAW).days // 7 + 1
+
+
+def _base_url() -> str:
+    override = os.environ.get('SITE_URL_OVERRIDE')
+    if not override:
+        return DRAW_API_URL
+    return override.rstrip('/') + '/common.do?method=getLottoNumber&drwNo={round}'
+
+
+def _fetch_draw(round_no: int):
+    """Fetch a draw from the official API, None if not drawn yet"""
+    get_rate_limiter().acquire()
+    request = urllib.request.Request(
+        _base_url().format(round=round_no),
+        headers={'User-Agent': 'Mozilla/5.0'},
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        data = json.loads(response.read().decode('utf-8'))
+
+    if data.get('returnValue') != 'success':
+        return None
+    return {
+        'round': data['drwNo'],
+        'date': data.get('drwNoDate'),
+        'numbers': [data[f'drwtNo{i}'] for i in range(1, 7)],
+        'bonus': data['bnusNo'],
+        'first_prize': data.get('firstWinamnt'),
+    }
+
+
+def get_draw(round_no: int):
+    """
+    Get the result of a round, fetched at most once per container
+
+    Results are cached in memory and in CACHE_DIR so warm invocations and
+    all accounts share them. Rounds that are not drawn yet are not cached.
+
+    Returns:
+        dict with 'round', 'date', 'numbers', 'bonus', 'first_prize', or None if not drawn yet
+    """
+    with _draws_lock:
+        if round_no in _draws:
+            return _draws[round_no]
+
+        cache_path = os.path.join(CACHE_DIR, f'{round_no}.json')
+        draw = None
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path) as f:
+                    draw = json.load(f)
+            except (OSError, ValueError):
+                draw = None
+
+        if draw is None:
+            try:
+                draw = _fetch_draw(round_no)
+            except Exception as e:
+                logger.error(f"Failed to fetch draw result for round {round_no}: {e}")
+                return None
+            if draw is None:
+                logger.info(f"Round {round_no} has not been drawn yet")
+                return None
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                with open(cache_path, 'w') as f:
+                    json.dump(draw, f)
+            except OSError as e:
+                logger.warning(f"Failed to cache draw result for round {round_no}: {e}")
+
+        _draws[round_no] = draw
+        return draw
+
+
+def _mask(numbers) -> int:
+    """Bitmask with bit n set for each number n"""
+    mask = 0
+    for number in numbers:
+        mask |= 1 << int(number)
+    return mask
+
+
+def _rank(matched: int, bonus_matched: bool):
+    if matched == 6:
+        return 1
+    if matched == 5:
+        return 2 if bonus_matched else 3
+    if matched == 4:
+        return 4
+    if matched == 3:
+        return 5
+    return None
+
+
+def match_tickets(tickets: list) -> list:
+    """
+    Match tickets against official draw results in one pass
+
+    Each ticket and draw is reduced to a 46-bit mask, so matching is a
+    single AND + popcount per ticket. Draws are fetched once per distinct
+    round across all tickets.
+
+    Args:
+        tickets: list of dicts with 'round', 'slot' and 'numbers' (6 ints)
+
+    Returns:
+        list of dicts with ticket fields plus 'matched', 'bonus_matched',
+        'rank' (1-5 or None), 'prize' (KRW, None if unknown) and 'drawn'
+    """
+    draws = {round_no: get_draw(round_no) for round_no in {ticket['round'] for ticket in tickets}}
+    masks = {
+        round_no: (_mask(draw['numbers']), 1 << draw['bonus'])
+        for round_no, draw in draws.items() if draw
+    }
+
+    matches = []
+    for ticket in tickets:
+        result = dict(ticket, matched=None, bonus_matched=None, rank=None, prize=None, drawn=False)
+        if ticket['round'] in masks:
+            winning_mask, bonus_mask = masks[ticket['round']]
+            ticket_mask = _mask(ticket['numbers'])
+            matched = bin(ticket_mask & winning_mask).count('1')
+            bonus_matched = bool(ticket_mask & bonus_mask)
+            rank = _rank(matched, bonus_matched)
+            prize = FIXED_PRIZES.get(rank)
+            if rank == 1:
+                prize = draws[ticket['round']].get('first_prize')
+            result.update(matched=matched, bonus_matched=bonus_matched, rank=rank, prize=prize, drawn=True)
+        matches.append(result)
+    return matches
@@ -0,0 +1,144 @@
+"""
+Flow Engine
+Declarative step tables executed with step-level retry and checkpoint resume
+
+Step targets are element names of the selector registry, resolved on the
+page of the last navigate/frame step.
+"""
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_STEP_RETRIES = 2
+MAX_RESUMES = 1
+RETRY_DELAY_SECONDS = 1
+
+
+class FlowError(Exception):
+    """Raised when a step keeps failing after retries and resumes"""
+
+    def __init__(self, step: dict, cause: Exception):
+        super().__init__(f"Step '{step['name']}' failed: {cause}")
+        self.step = step
+        self.cause = cause
+
+
+class FlowAbort(Exception):
+    """Raised by a step to stop the flow without retrying (e.g., login required)"""
+
+
+def _step(action: str, name: str, target=None, value=None, wait: float = 0,
+          checkpoint: bool = False, retryable: bool = True, page: str = None) -> dict:
+    return {
+        'action': action,
+        'name': name,
+        'page': page,
+        'target': target,
+        'value': value,
+        'wait': wait,
+        'checkpoint': checkpoint,
+        'retryable': retryable,
+    }
+
+
+def navigate(name: str, url: str, page: str, wait: float = 5) -> dict:
+    """Load a page and check its layout; flows resume from the last navigate step"""
+    return _step('navigate', name, target=url, wait=wait, checkpoint=True, page=page)
+
+
+def switch_frame(name: str, selector: str, page: str) -> dict:
+    """Switch into an iframe and check the layout of its page"""
+    return _step('frame', name, target=selector, page=page)
+
+
+def click(name: str, selector: str, wait: float = 1) -> dict:
+    """Click an element"""
+    return _step('click', name, target=selector, wait=wait)
+
+
+def select(name: str, selector: str, index: int) -> dict:
+    """Select an option of a <select> by index"""
+    return _step('select', name, target=selector, value=index)
+
+
+def confirm(name: str, selector: str, wait: float = 5) -> dict:
+    """
+    Click the final confirmation of a purchase
+
+    Never retried: a failed confirm may already have bought tickets, and no
+    step before it is resumed afterwards.
+    """
+    return _step('confirm', name, target=selector, wait=wait, retryable=False)
+
+
+def verify(name: str, value=None) -> dict:
+    """Check the outcome of the flow"""
+    return _step('verify', name, value=value, retryable=False)
+
+
+def run_flow(driver, username: str, steps: list, run_step, recover=None,
+             max_step_retries: int = MAX_STEP_RETRIES, max_resumes: int = MAX_RESUMES) -> dict:
+    """
+    Execute a step table inside the current browser session
+
+    A failing step is retried up to max_step_retries times (after calling
+    recover, e.g. to close a popup). If it still fails, the flow resumes from
+    the last checkpoint (navigate step) up to max_resumes times. Once a
+    non-retryable step has run, there is no checkpoint to resume from.
+
+    Args:
+        run_step: callable(driver, username, step) executing one step; its
+                  return value of the last step is returned as 'result'
+        recover: optional callable(driver, username) run before each retry
+
+    Returns:
+        dict with 'result' of the last step, 'retries' and 'resumes'
+
+    Raises:
+        FlowError: If a step fails permanently
+        FlowAbort: If a step aborts the flow
+    """
+    checkpoint = 0
+    retries = 0
+    resumes = 0
+    result = None
+    i = 0
+
+    while i < len(steps):
+        step = steps[i]
+        attempts = max_step_retries + 1 if step['retryable'] else 1
+        error = None
+
+        for attempt in range(attempts):
+            try:
+                result = run_step(driver, username, step)
+                error = None
+                break
+            except FlowAbort:
+                raise
+            except Exception as e:
+                error = e
+                if attempt + 1 < attempts:
+                    retries += 1
+                    logger.warning(f"{username}: Step '{step['name']}' failed ({e}), retrying ({attempt + 1}/{max_step_retries})")
+                    if recover:
+                        recover(driver, username)
+                    time.sleep(RETRY_DELAY_SECONDS)
+
+        if error is not None:
+            if step['retryable'] and checkpoint is not None and resumes < max_resumes:
+                resumes += 1
+                logger.warning(f"{username}: Step '{step['name']}' failed, resuming from '{steps[checkpoint]['name']}'")
+                i = checkpoint
+                continue
+            raise FlowError(step, error)
+
+        if not step['retryable']:
+            # Past the point of no return
+            checkpoint = None
+        elif step['checkpoint'] and checkpoint is not None:
+            checkpoint = i
+        i += 1
+
+    return {'result': result, 'retries': retries, 'resumes': resumes}
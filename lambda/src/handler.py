@@ -4,30 +4,179 @@ Entry point for Lambda function
 """
 import os
 import json
+import time
 import logging
-import boto3
-from secrets_manager import get_all_credentials
+from concurrent.futures import ThreadPoolExecutor
+from config import env_flag, env_int
+from secrets_manager import get_credential_provider, select_shard, get_low_balance_threshold, get_weekly_budget
 from lotto import buy_lotto_ticket, check_lotto_balance, check_lotto_result, buy_pension_lotto, check_pension_lotto_reservation
+from lotto import warm_browser, warm_login
+from draw_results import latest_drawn_round, get_draw
+from throttle import get_rate_limiter
+from ticket_store import get_lotto_tickets, get_pension_rounds
+from pension_planner import plan_pension, record_reservation, next_pension_round, DEFAULT_WEEKLY_BUDGET
+from notifications import reset_collector, get_sns_client, ERROR, SUMMARY, WINNING
+from tracing import flush_trace
+from resources import housekeeping
+from run_history import append_run
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# SNS client for notifications
-sns_client = boto3.client('sns')
+def get_max_concurrency() -> int:
+    """Number of accounts processed in parallel (MAX_CONCURRENT_ACCOUNTS, default: 1)"""
+    return env_int('MAX_CONCURRENT_ACCOUNTS', 1, minimum=1)
 
 
-def send_notification(topic_arn: str, subject: str, message: str):
-    """Send notification via SNS"""
+# Stored tickets of this many most recent draws are checked locally
+RESULT_CHECK_ROUNDS = 4
+
+
+def check_result_for_account(username: str, password: str) -> dict:
+    """
+    Check results from stored tickets when available, otherwise scrape the ledger
+
+    Only lotto 6/45 tickets are matched locally. When the account has drawn
+    pension 720+ tickets, the ledger (which lists both games) is scraped as
+    well so pension wins are not missed. Set RESULT_RECONCILE=1 to always
+    scrape the ledger when tickets are known.
+    """
+    latest = latest_drawn_round()
+    tickets = get_lotto_tickets(username, min_round=latest - RESULT_CHECK_ROUNDS + 1, max_round=latest)
+
+    pension_latest = next_pension_round() - 1
+    pension_rounds = get_pension_rounds(username, min_round=pension_latest - RESULT_CHECK_ROUNDS + 1, max_round=pension_latest)
+
+    reconcile = bool(pension_rounds) or env_flag('RESULT_RECONCILE')
+    return check_lotto_result(username, password, tickets=tickets, reconcile=reconcile)
+
+
+def plan_pension_for_account(username: str, balance: int = None) -> dict:
+    """Plan the pension reservation with the weekly budget from the secret (weeklyBudget)"""
+    secret_name = os.environ.get('SECRET_NAME')
+    weekly_budget = get_weekly_budget(secret_name, DEFAULT_WEEKLY_BUDGET) if secret_name else DEFAULT_WEEKLY_BUDGET
+    return plan_pension(username, balance, weekly_budget)
+
+
+def run_step(step: str, func, *args) -> dict:
+    """Run one account step and tag its result with the step name and duration (run history)"""
+    started = time.time()
+    result = func(*args)
+    result['step'] = step
+    result['duration_s'] = round(time.time() - started, 2)
+    return result
+
+
+def process_account(action: str, username: str, password: str) -> tuple:
+    """
+    Run an action for a single account
+
+    Returns:
+        tuple of (list of result dicts, list of error messages)
+    """
+    logger.info(f"Processing account: {username}")
+    account_results = []
+    errors = []
+
     try:
-        sns_client.publish(
-            TopicArn=topic_arn,
-            Subject=subject,
-            Message=message
-        )
-        logger.info(f"Notification sent: {subject}")
+        if action == 'buy_ticket':
+            result = run_step('buy_lotto', buy_lotto_ticket, username, password)
+            account_results.append(result)
+
+            # Also check balance after purchase
+            balance_result = run_step('check_balance', check_lotto_balance, username, password)
+            account_results.append(balance_result)
+
+            # Reserve pension in multi-round batches; covered weeks skip the pension path
+            plan = run_step('plan_pension', plan_pension_for_account, username, balance_result.get('balance'))
+            account_results.append(plan)
+            if plan['rounds']:
+                # Reservations made outside this automation are not in the ticket store
+                reservation = run_step('check_pension', check_pension_lotto_reservation, username, password)
+                account_results.append(reservation)
+                if reservation['status'] == 'reserved':
+                    record_reservation(username, plan)
+                elif reservation['status'] == 'not_reserved':
+                    purchase = run_step('buy_pension', buy_pension_lotto, username, password, plan['rounds'])
+                    account_results.append(purchase)
+                    if purchase['status'] == 'success':
+                        # Coverage must not depend on parsing the receipt
+                        record_reservation(username, plan)
+
+            # Also check result after purchase
+            check_result = run_step('check_result', check_result_for_account, username, password)
+            account_results.append(check_result)
+
+        elif action == 'buy_pension_ticket':
+            result = run_step('buy_pension', buy_pension_lotto, username, password)
+            account_results.append(result)
+            if result['status'] == 'success':
+                record_reservation(username, {'next_round': next_pension_round(), 'rounds': result['ticket_count']})
+
+            check_result = run_step('check_pension', check_pension_lotto_reservation, username, password)
+            account_results.append(check_result)
+
+        elif action == 'check_balance':
+            result = run_step('check_balance', check_lotto_balance, username, password)
+            account_results.append(result)
+
+        elif action == 'check_result':
+            result = run_step('check_result', check_result_for_account, username, password)
+            account_results.append(result)
+
+        else:
+            logger.error(f"Unknown action: {action}")
+            return [], []
+
+        # Check for errors
+        for result in account_results:
+            if result.get('status') == 'error':
+                errors.append(result.get('message'))
+
     except Exception as e:
-        logger.error(f"Failed to send notification: {e}")
+        error_msg = f"{username}: Error - {str(e)}"
+        logger.error(error_msg)
+        return [], [error_msg]
+
+    return account_results, errors
+
+
+def prewarm(secret_name: str, accounts: list, login: bool = False) -> tuple:
+    """
+    Ready the container for the scheduled run without buying anything
+
+    Initializes the AWS clients, caches secrets and the latest draw result,
+    launches and health-checks Chrome and optionally caches a login session
+    per account. Secrets stay cached for SECRET_CACHE_TTL and sessions for
+    SESSION_CACHE_TTL, so schedule the prewarm within both of them.
+
+    Returns:
+        tuple of (list of result dicts, list of error messages)
+    """
+    results = []
+    errors = []
+
+    get_sns_client()
+    get_rate_limiter()
+    get_low_balance_threshold(secret_name)
+
+    latest = latest_drawn_round()
+    if get_draw(latest) is None:
+        logger.warning(f"Draw result of round {latest} is not available yet")
+
+    browser = warm_browser()
+    results.append(browser)
+
+    if login and browser['status'] == 'success':
+        for username, password in accounts:
+            results.append(warm_login(username, password))
+
+    for result in results:
+        if result.get('status') == 'error':
+            errors.append(result.get('message'))
+
+    return results, errors
 
 
 def lambda_handler(event, context):
@@ -36,7 +185,11 @@ def lambda_handler(event, context):
 
     Event format:
     {
-        "action": "buy_ticket"  # buy_ticket, check_balance, check_result
+        "action": "buy_ticket",  # buy_ticket, check_balance, check_result, prewarm
+        "shard_index": 0,        # optional: process only this shard of the accounts
+        "shard_count": 1,
+        "usernames": ["id1"],    # optional: process only these accounts
+        "login": false           # prewarm only: also cache a login session per account
     }
 
     Credentials are read from SECRET_NAME environment variable.
@@ -47,6 +200,10 @@ def lambda_handler(event, context):
             {"username": "id2", "password": "pw2"}
         ]
     }
+    or per-account secrets listed in the main secret:
+    {
+        "accountSecrets": ["lotto-automation/accounts/id1", "lotto-automation/accounts/id2"]
+    }
     """
     logger.info(f"Event: {json.dumps(event)}")
 
@@ -63,16 +220,30 @@ def lambda_handler(event, context):
         }
 
     action = event.get('action', 'buy_ticket')
+    started_at = time.time()
+    run_id = getattr(context, 'aws_request_id', None) or time.strftime('%Y%m%dT%H%M%S')
+    # Low balance / winning events from lotto.py are collected here and sent as one digest
+    collector = reset_collector()
     all_results = []
     errors = []
 
+    # Reclaim processes and /tmp space leaked by earlier invocations of this container
+    housekeeping('start')
+
     try:
-        # Get all credentials from Secrets Manager
+        # Resolve credentials of this worker's shard from Secrets Manager
         logger.info(f"Retrieving credentials from: {secret_name}")
-        credentials_list = get_all_credentials(secret_name)
+        provider = get_credential_provider(secret_name)
+        account_ids = select_shard(
+            provider.list_account_ids(),
+            int(event.get('shard_index', 0)),
+            int(event.get('shard_count', 1)),
+        )
+        credentials_list = provider.get_credentials(account_ids)
         logger.info(f"Found {len(credentials_list)} accounts")
 
-        # Process each account
+        # Collect valid accounts
+        accounts = []
         for i, creds in enumerate(credentials_list):
             username = creds.get('username')
             password = creds.get('password')
@@ -81,81 +252,62 @@ def lambda_handler(event, context):
                 logger.warning(f"Account {i+1}: Missing username or password, skipping")
                 continue
 
-            logger.info(f"Processing account: {username}")
-            account_results = []
-
-            try:
-                if action == 'buy_ticket':
-                    result = buy_lotto_ticket(username, password)
-                    account_results.append(result)
-
-                    check_result = check_pension_lotto_reservation(username, password)
-                    if check_result['status'] != 'reserved':
-                        account_results.append(
-                            buy_pension_lotto(username, password)
-                        )
-
-                    # Also check balance after purchase
-                    balance_result = check_lotto_balance(username, password)
-                    account_results.append(balance_result)
-
-                    # Also check result after purchase
-                    check_result = check_lotto_result(username, password)
-                    account_results.append(check_result)
-
-                elif action == 'buy_pension_ticket':
-                    result = buy_pension_lotto(username, password)
-                    account_results.append(result)
-
-                    check_result = check_pension_lotto_reservation(username, password)
-                    account_results.append(check_result)
-
-                elif action == 'check_balance':
-                    result = check_lotto_balance(username, password)
-                    account_results.append(result)
-
-                elif action == 'check_result':
-                    result = check_lotto_result(username, password)
-                    account_results.append(result)
-
-                else:
-                    logger.error(f"Unknown action: {action}")
-                    continue
-
-                # Check for errors
-                for result in account_results:
-                    if result.get('status') == 'error':
-                        errors.append(result.get('message'))
-
-                all_results.extend(account_results)
-
-            except Exception as e:
-                error_msg = f"{username}: Error - {str(e)}"
-                logger.error(error_msg)
-                errors.append(error_msg)
-
-        # Send notification
+            accounts.append((username, password))
+
+        # Optional subset of accounts by username (e.g., manual or local runs)
+        usernames = event.get('usernames')
+        if usernames:
+            accounts = [account for account in accounts if account[0] in usernames]
+            logger.info(f"Selected {len(accounts)} of {len(credentials_list)} accounts by username")
+
+        if action == 'prewarm':
+            # Nothing is bought and no digest is sent; the scheduled run reports problems
+            all_results, errors = prewarm(secret_name, accounts, bool(event.get('login', False)))
+            return {
+                'statusCode': 200 if not errors else 500,
+                'body': json.dumps({
+                    'action': action,
+                    'total_accounts': len(credentials_list),
+                    'results': all_results,
+                    'errors': errors
+                })
+            }
+
+        # Process each account (optionally in parallel, see MAX_CONCURRENT_ACCOUNTS)
+        max_concurrency = get_max_concurrency()
+        if max_concurrency > 1 and len(accounts) > 1:
+            logger.info(f"Processing {len(accounts)} accounts with concurrency {max_concurrency}")
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                outcomes = list(executor.map(lambda account: process_account(action, *account), accounts))
+        else:
+            outcomes = [process_account(action, username, password) for username, password in accounts]
+
+        for account_results, account_errors in outcomes:
+            all_results.extend(account_results)
+            errors.extend(account_errors)
+
+        # Send one digest with errors, alerts and per-account results
         if sns_topic_arn:
+            for error in errors:
+                collector.add(ERROR, None, f"- {error}")
+            for i, result in enumerate(all_results):
+                line = f"- {result.get('username', 'Unknown')}: {result.get('status', 'Unknown')}"
+                if result.get('message'):
+                    line += f"\n  {result.get('message')}"
+                collector.add(SUMMARY, result.get('username'), line, fingerprint=f"{i}:{line}")
+
             if errors:
-                send_notification(
-                    sns_topic_arn,
-                    "[Lotto Automation] Error",
-                    "\n".join(errors)
-                )
+                subject = "[Lotto Automation] Error"
+            elif collector.has(WINNING):
+                subject = "[Lotto Automation] Success - Winning Ticket Found!"
             else:
-                # Success notification
-                success_message = f"Action: {action}\n"
-                success_message += f"Accounts processed: {len(credentials_list)}\n\n"
-                for result in all_results:
-                    success_message += f"- {result.get('username', 'Unknown')}: {result.get('status', 'Unknown')}\n"
-                    if result.get('message'):
-                        success_message += f"  {result.get('message')}\n"
-
-                send_notification(
-                    sns_topic_arn,
-                    "[Lotto Automation] Success",
-                    success_message
-                )
+                subject = "[Lotto Automation] Success"
+
+            collector.flush(
+                sns_topic_arn,
+                subject,
+                header=f"Action: {action}\nAccounts processed: {len(credentials_list)}\n\n"
+            )
 
         return {
             'statusCode': 200 if not errors else 500,
@@ -170,15 +322,20 @@ def lambda_handler(event, context):
     except Exception as e:
         error_msg = f"Lambda execution failed: {str(e)}"
         logger.error(error_msg)
+        errors.append(error_msg)
 
         if sns_topic_arn:
-            send_notification(
-                sns_topic_arn,
-                "[Lotto Automation] Critical Error",
-                error_msg
-            )
+            collector.add(ERROR, None, f"- {error_msg}")
+            collector.flush(sns_topic_arn, "[Lotto Automation] Critical Error")
 
         return {
             'statusCode': 500,
             'body': json.dumps({'error': error_msg})
         }
+
+    finally:
+        # Write per-run CDP trace summary (no-op unless CHROME_TRACE is set)
+        flush_trace(run_id)
+        # Append this run to the history archive (local, optionally HISTORY_S3_BUCKET)
+        append_run(run_id, action, started_at, time.time() - started_at, all_results, errors)
+        housekeeping('end')
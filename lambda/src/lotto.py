@@ -3,75 +3,68 @@ Lotto Automation for AWS Lambda
 Selenium-based automation for dhlottery.co.kr
 """
 import os
+import re
 import time
 import shutil
+import tempfile
 import logging
-import boto3
+from datetime import datetime
+from urllib.parse import urlsplit
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select, WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import TimeoutException
 from secrets_manager import get_low_balance_threshold
+import flows
+from flows import run_flow, FlowAbort, FlowError
+from selector_registry import probe_page, find, find_all, is_present
+from browser_pool import is_shared_browser_enabled, get_shared_browser, get_context_slots, CONTEXT_SLOT_TIMEOUT
+from config import KST
+from draw_results import match_tickets, latest_drawn_round
+from ticket_store import add_lotto_tickets, add_pension_tickets
+from session_cache import save_session, load_session, clear_session
+from resources import register_driver, unregister_driver
+from notifications import get_collector, LOW_BALANCE, WINNING
+from throttle import load_with_backoff, is_queue_page, wait_for_queue
+from tracing import is_tracing_enabled, enable_tracing, start_tracing, begin_navigation, end_navigation, end_session
 
 logger = logging.getLogger(__name__)
 
-# SNS client for notifications
-sns_client = boto3.client('sns')
-
 # Default low balance threshold (KRW) - can be overridden by Secrets Manager
 DEFAULT_LOW_BALANCE_THRESHOLD = 30000
 
 
 def send_low_balance_notification(username: str, balance: int, balance_text: str, threshold: int):
-    """Send SNS notification when balance is below threshold"""
-    sns_topic_arn = os.environ.get('SNS_TOPIC_ARN')
-    if not sns_topic_arn:
-        logger.warning("SNS_TOPIC_ARN not configured, skipping low balance notification")
-        return
-
-    try:
-        subject = "[Lotto] Low Balance Alert - Recharge Required"
-        message = (
-            f"Account: {username}\n"
-            f"Current Balance: {balance_text}\n"
-            f"Threshold: {threshold:,}원\n\n"
-            f"Your lotto account balance is below the threshold.\n"
-            f"Please recharge to continue automatic purchases."
-        )
-        sns_client.publish(
-            TopicArn=sns_topic_arn,
-            Subject=subject,
-            Message=message
-        )
-        logger.info(f"{username}: Low balance notification sent (balance: {balance_text})")
-    except Exception as e:
-        logger.error(f"{username}: Failed to send low balance notification: {e}")
-
-
-def send_winning_notification(username: str):
-    """Send SNS notification when winning ticket is found"""
-    sns_topic_arn = os.environ.get('SNS_TOPIC_ARN')
-    if not sns_topic_arn:
-        logger.warning("SNS_TOPIC_ARN not configured, skipping winning notification")
-        return
+    """Queue a low balance alert for the end-of-run notification digest"""
+    get_collector().add(
+        LOW_BALANCE,
+        username,
+        f"- {username}: {balance_text} (threshold: {threshold:,}원) - please recharge",
+        # At most one reminder per account and week, even if the balance stays the same
+        fingerprint=datetime.now(KST).strftime('%G-W%V'),
+    )
+    logger.info(f"{username}: Low balance notification queued (balance: {balance_text})")
+
+
+def send_winning_notification(username: str, wins: list):
+    """
+    Queue one winning notice per winning ticket for the end-of-run notification digest
 
-    try:
-        subject = "[Lotto] Winning Ticket Found!"
-        message = (
-            f"Account: {username}\n\n"
-            f"Congratulations! You have winning ticket(s)!\n\n"
-            f"Please check your account for details."
-        )
-        sns_client.publish(
-            TopicArn=sns_topic_arn,
-            Subject=subject,
-            Message=message
+    Args:
+        wins: list of (description, identity) tuples; the identity of a ticket
+              (round + slot/number) keys deduplication across runs
+    """
+    collector = get_collector()
+    for description, identity in wins:
+        collector.add(
+            WINNING,
+            username,
+            f"- {username}: Congratulations! {description}",
+            fingerprint=identity,
         )
-        logger.info(f"{username}: Winning notification sent")
-    except Exception as e:
-        logger.error(f"{username}: Failed to send winning notification: {e}")
+    logger.info(f"{username}: {len(wins)} winning notification(s) queued")
 
 
 def cleanup_chrome_tmp():
@@ -113,13 +106,13 @@ def find_executable(paths):
     return None
 
 
-def get_chrome_driver():
+def build_chrome_options(shared: bool = False) -> Options:
     """
-    Create Chrome WebDriver configured for Lambda environment
-    """
-    # Clean up previous Chrome data
-    cleanup_chrome_tmp()
+    Chrome options shared by all sessions
 
+    Args:
+        shared: Options for the shared multi-account browser (no --single-process)
+    """
     options = Options()
 
     # Core headless settings - use new headless mode for better compatibility
@@ -134,11 +127,11 @@ def get_chrome_driver():
     # Lambda-specific memory and resource constraints
     options.add_argument('--disable-dev-shm-usage')
     options.add_argument('--disable-setuid-sandbox')
-    options.add_argument('--single-process')
+    if not shared:
+        # A shared browser hosts several accounts and needs separate renderers
+        options.add_argument('--single-process')
 
     # Use /tmp for all Chrome data (Lambda only has /tmp writable)
-    options.add_argument('--user-data-dir=/tmp/chrome-user-data')
-    options.add_argument('--disk-cache-dir=/tmp/chrome-cache')
     options.add_argument('--crash-dumps-dir=/tmp/chrome-crashes')
     options.add_argument('--homedir=/tmp')
 
@@ -162,29 +155,38 @@ def get_chrome_driver():
     options.add_experimental_option('excludeSwitches', ['enable-automation'])
     options.add_experimental_option('useAutomationExtension', False)
 
-    # Find Chrome binary
+    return options
+
+
+def find_chrome_binary():
+    """Find Chrome binary, logging /opt contents if missing"""
     chrome_path = find_executable(CHROME_PATHS)
     if chrome_path:
         logger.info(f"Found Chrome at: {chrome_path}")
-        options.binary_location = chrome_path
     else:
         logger.warning("Chrome binary not found in expected paths")
         # List /opt contents for debugging
         if os.path.exists('/opt'):
             for item in os.listdir('/opt'):
                 logger.info(f"/opt/{item}")
+    return chrome_path
 
-    # Find ChromeDriver
+
+def create_webdriver(options: Options):
+    """Start a ChromeDriver session with the given options"""
     chromedriver_path = find_executable(CHROMEDRIVER_PATHS)
     if chromedriver_path:
         logger.info(f"Found ChromeDriver at: {chromedriver_path}")
         service = Service(executable_path=chromedriver_path)
-        driver = webdriver.Chrome(service=service, options=options)
-    else:
-        logger.warning("ChromeDriver not found, trying auto-detection")
-        # Let Selenium try to find/download driver automatically
-        driver = webdriver.Chrome(options=options)
+        return webdriver.Chrome(service=service, options=options)
+
+    logger.warning("ChromeDriver not found, trying auto-detection")
+    # Let Selenium try to find/download driver automatically
+    return webdriver.Chrome(options=options)
 
+
+def prepare_session(driver):
+    """Anti-detection overrides and optional tracing for a new page session"""
     # Anti-detection: Override navigator.webdriver
     driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
         'source': '''
@@ -200,34 +202,208 @@ def get_chrome_driver():
         '''
     })
 
+    if is_tracing_enabled():
+        start_tracing(driver)
+
+
+def get_context_driver():
+    """
+    Create a WebDriver session on an isolated browser context of the shared Chrome
+
+    The context has its own cookie jar, so logins never leak between
+    accounts. The number of open contexts is bounded by MAX_BROWSER_CONTEXTS.
+    """
+    chrome_path = find_chrome_binary()
+    if not chrome_path:
+        raise RuntimeError("Chrome binary is required for the shared browser")
+
+    browser = get_shared_browser(chrome_path, build_chrome_options(shared=True).arguments)
+    slots = get_context_slots()
+    if not slots.acquire(timeout=CONTEXT_SLOT_TIMEOUT):
+        raise RuntimeError(f"No free browser context after {CONTEXT_SLOT_TIMEOUT}s (MAX_BROWSER_CONTEXTS)")
+
+    # Until the driver is returned, the caller cannot release the context or the slot
+    context_id = None
+    driver = None
+    try:
+        context_id, target_id = browser.create_context()
+
+        # Attach to the running browser; automation switches are not accepted here
+        options = Options()
+        options.debugger_address = browser.debugger_address
+        if is_tracing_enabled():
+            enable_tracing(options)
+        driver = create_webdriver(options)
+
+        # Window handles are DevTools target IDs
+        handle = next((h for h in driver.window_handles if h.upper() == target_id.upper()), None)
+        if handle is None:
+            raise RuntimeError(f"Page of browser context {context_id} not found")
+        driver.switch_to.window(handle)
+
+        prepare_session(driver)
+        driver.driver_pid = driver.service.process.pid
+        register_driver(driver_pid=driver.driver_pid)
+    except Exception:
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception as e:
+                logger.warning(f"Failed to quit Chrome: {e}")
+            unregister_driver(driver_pid=getattr(driver, 'driver_pid', None))
+        if context_id:
+            browser.dispose_context(context_id)
+        slots.release()
+        raise
+
+    driver.browser_context_id = context_id
+    driver.shared_browser = browser
     return driver
 
 
+def get_chrome_driver():
+    """
+    Create Chrome WebDriver configured for Lambda environment
+
+    With CHROME_SHARED_BROWSER set, returns a session on an isolated browser
+    context of one shared Chrome process instead of launching a new Chrome.
+    """
+    if is_shared_browser_enabled():
+        return get_context_driver()
+
+    # Clean up previous Chrome data
+    cleanup_chrome_tmp()
+
+    options = build_chrome_options()
+
+    # Each driver gets its own profile so accounts can run concurrently
+    profile_dir = tempfile.mkdtemp(prefix='chrome-user-data-', dir='/tmp')
+    options.add_argument(f'--user-data-dir={profile_dir}')
+    options.add_argument(f'--disk-cache-dir={profile_dir}/cache')
+
+    # Opt-in CDP Network/Performance tracing (CHROME_TRACE=1)
+    if is_tracing_enabled():
+        enable_tracing(options)
+
+    chrome_path = find_chrome_binary()
+    if chrome_path:
+        options.binary_location = chrome_path
+
+    driver = create_webdriver(options)
+    driver.profile_dir = profile_dir
+    driver.driver_pid = driver.service.process.pid
+    # Protect the live session from /tmp eviction and the process reaper
+    register_driver(profile_dir, driver.driver_pid)
+    prepare_session(driver)
+
+    return driver
+
+
+def quit_driver(driver):
+    """Quit Chrome (or release the shared browser context) and remove the driver's profile directory"""
+    # Late CDP events are lost once the session quits
+    end_session(driver)
+
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"Failed to quit Chrome: {e}")
+
+    context_id = getattr(driver, 'browser_context_id', None)
+    if context_id:
+        driver.shared_browser.dispose_context(context_id)
+        get_context_slots().release()
+
+    profile_dir = getattr(driver, 'profile_dir', None)
+    if profile_dir:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+    unregister_driver(profile_dir, getattr(driver, 'driver_pid', None))
+
+
+def resolve_url(url: str) -> str:
+    """Rewrite scheme and host to SITE_URL_OVERRIDE (local site stand-in) if set"""
+    override = os.environ.get('SITE_URL_OVERRIDE')
+    if not override:
+        return url
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    return override.rstrip('/') + path
+
+
+def open_page(driver, url: str, username: str = None):
+    """
+    Navigate to url through the global rate limiter
+
+    Waiting-queue pages are polled until they clear and throttling responses
+    are retried with jittered backoff. CDP metrics are recorded when tracing
+    is enabled.
+    """
+    url = resolve_url(url)
+    begin_navigation(driver)
+    started_at = time.time()
+    load_with_backoff(driver, url, username)
+    end_navigation(driver, url, username, started_at)
+
+
+def restore_session(driver, username: str) -> bool:
+    """
+    Reuse the cached login session of an account, if any
+
+    Returns:
+        True if the browser is logged in with the cached cookies
+    """
+    cookies = load_session(username)
+    if not cookies:
+        return False
+
+    driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+    open_page(driver, 'https://www.dhlottery.co.kr/mypage/home', username)
+    if is_present(driver, 'login', 'user_id'):
+        logger.info(f"{username}: Cached session expired, logging in again")
+        clear_session(username)
+        return False
+
+    logger.info(f"{username}: Reusing cached login session")
+    return True
+
+
 def login_lotto(driver, username: str, password: str):
-    """Login to dhlottery.co.kr"""
+    """Login to dhlottery.co.kr, reusing a cached session when possible"""
+    if restore_session(driver, username):
+        return
+
     logger.info(f"Logging in as {username}")
 
-    driver.get('https://www.dhlottery.co.kr/login')
+    open_page(driver, 'https://www.dhlottery.co.kr/login', username)
     logger.info(f"Current URL: {driver.current_url}")
 
-    # Wait for login form to be present
-    wait = WebDriverWait(driver, 20)
-
     try:
-        user_id_field = wait.until(EC.presence_of_element_located((By.XPATH, '//*[@id="inpUserId"]')))
+        # Wait for a known login form layout (fails fast on a redesign)
+        probe_page(driver, 'login', timeout=20)
+        user_id_field = find(driver, 'login', 'user_id')
         logger.info("Found userId field")
         user_id_field.send_keys(username)
 
-        password_field = driver.find_element(By.XPATH, '//*[@id="inpUserPswdEncn"]')
+        password_field = find(driver, 'login', 'password')
         password_field.send_keys(password)
 
-        login_btn = driver.find_element(By.XPATH, '//*[@id="btnLogin"]')
+        login_url = driver.current_url
+        login_btn = find(driver, 'login', 'login_button')
         login_btn.click()
 
-        # Wait for login to complete
-        time.sleep(5)
+        # Wait for login to complete (leaving the login page), riding out any waiting queue
+        try:
+            WebDriverWait(driver, 20).until(lambda d: d.current_url != login_url or is_queue_page(d))
+        except TimeoutException:
+            logger.warning(f"{username}: Still on login page after 20s")
+        if is_queue_page(driver):
+            wait_for_queue(driver, username)
         logger.info(f"Login completed. Current URL: {driver.current_url}")
 
+        if not is_present(driver, 'login', 'user_id'):
+            save_session(username, driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies'))
+
     except Exception as e:
         logger.error(f"Login failed. Page source length: {len(driver.page_source)}")
         logger.error(f"Current URL: {driver.current_url}")
@@ -235,11 +411,69 @@ def login_lotto(driver, username: str, password: str):
         raise e
 
 
-def wait_for_element(driver, by, value, timeout=10):
-    """Wait for an element to be present and return it"""
-    wait = WebDriverWait(driver, timeout)
-    element = wait.until(EC.presence_of_element_located((by, value)))
-    return element
+def warm_browser() -> dict:
+    """
+    Launch and health-check Chrome without visiting the site
+
+    With CHROME_SHARED_BROWSER the shared Chrome stays running for the next
+    invocation; otherwise a throwaway session loads the binary and its
+    libraries into the page cache.
+
+    Returns:
+        dict with status, message and startup time in seconds
+    """
+    started_at = time.time()
+    driver = None
+
+    try:
+        if is_shared_browser_enabled():
+            chrome_path = find_chrome_binary()
+            if not chrome_path:
+                raise RuntimeError("Chrome binary is required for the shared browser")
+            browser = get_shared_browser(chrome_path, build_chrome_options(shared=True).arguments)
+            if not browser.is_alive():
+                raise RuntimeError("Shared Chrome is not responding")
+            version = browser.send('Browser.getVersion').get('product')
+        else:
+            driver = get_chrome_driver()
+            driver.get('about:blank')
+            version = driver.capabilities.get('browserVersion')
+
+        elapsed = round(time.time() - started_at, 2)
+        message = f"Browser ready ({version}) in {elapsed}s"
+        logger.info(message)
+        return {'status': 'success', 'message': message, 'startup_seconds': elapsed}
+
+    except Exception as e:
+        message = f"Browser warm-up failed - {str(e)}"
+        logger.error(message)
+        return {'status': 'error', 'message': message, 'error': str(e)}
+
+    finally:
+        if driver:
+            quit_driver(driver)
+
+
+def warm_login(username: str, password: str) -> dict:
+    """Log in once so later sessions of this container reuse the cached cookies"""
+    driver = None
+
+    try:
+        driver = get_chrome_driver()
+        login_lotto(driver, username, password)
+
+        message = f"{username}: Login session cached"
+        logger.info(message)
+        return {'status': 'success', 'message': message, 'username': username}
+
+    except Exception as e:
+        message = f"{username}: Failed to warm login - {str(e)}"
+        logger.error(message)
+        return {'status': 'error', 'message': message, 'username': username, 'error': str(e)}
+
+    finally:
+        if driver:
+            quit_driver(driver)
 
 
 def close_popup_if_exists(driver, username):
@@ -266,107 +500,213 @@ def close_popup_if_exists(driver, username):
     return None
 
 
-def buy_lotto_ticket(username: str, password: str, ticket_count: int = 5) -> dict:
+# Single DOM extraction of the purchase receipt (runs in the current frame)
+RECEIPT_SCRIPT = """
+const text = (el) => el ? el.innerText : null;
+const receipt = document.getElementById('popReceipt');
+const rows = Array.from(document.querySelectorAll('#reportRow li')).map((li) => li.innerText);
+return {
+    round: text(document.getElementById('buyRound')),
+    rows: rows,
+    text: text(receipt) || (document.body ? document.body.innerText.slice(0, 20000) : '')
+};
+"""
+
+ROUND_PATTERN = re.compile(r'(?:제\s*)?(\d{3,5})\s*회')
+LOTTO_ROW_PATTERN = re.compile(r'\b([A-E])\b[^\d\n]*((?:\d{1,2}[\s,]+){5}\d{1,2})')
+PENSION_PATTERN = re.compile(r'([1-5])\s*조\s*((?:\d\s*){6})')
+
+
+def _extract_receipt(driver, username: str) -> dict:
+    try:
+        return driver.execute_script(RECEIPT_SCRIPT) or {}
+    except Exception as e:
+        logger.warning(f"{username}: Failed to read purchase receipt: {e}")
+        return {}
+
+
+def capture_lotto_receipt(driver, username: str) -> list:
     """
-    Buy lotto tickets (simplified version matching local working code)
+    Parse round, game slots and numbers from the lotto 6/45 purchase receipt
 
-    Args:
-        username: dhlottery.co.kr username
-        password: dhlottery.co.kr password
-        ticket_count: Number of tickets to buy (1-5)
+    Returns:
+        list of dicts with 'round', 'slot' and 'numbers' (empty if not found)
+    """
+    receipt = _extract_receipt(driver, username)
+    text = receipt.get('text') or ''
+    round_match = ROUND_PATTERN.search(receipt.get('round') or text)
+    if not round_match:
+        logger.warning(f"{username}: Round not found on purchase receipt")
+        return []
+    round_no = int(round_match.group(1))
+
+    lines = receipt.get('rows') or text.splitlines()
+    tickets = []
+    for line in lines:
+        match = LOTTO_ROW_PATTERN.search(line)
+        if not match:
+            continue
+        numbers = [int(n) for n in re.findall(r'\d{1,2}', match.group(2))]
+        if all(1 <= n <= 45 for n in numbers):
+            tickets.append({'round': round_no, 'slot': match.group(1), 'numbers': numbers})
+
+    logger.info(f"{username}: Captured {len(tickets)} games for round {round_no} from receipt")
+    return tickets
+
+
+def capture_pension_receipt(driver, username: str) -> list:
+    """
+    Parse rounds, groups and numbers from the pension 720+ reservation receipt
 
     Returns:
-        dict with status and message
+        list of dicts with 'round', 'group' and 'number' (empty if not found)
     """
-    driver = None
+    receipt = _extract_receipt(driver, username)
+    tickets = []
+    for line in (receipt.get('text') or '').splitlines():
+        round_match = ROUND_PATTERN.search(line)
+        number_match = PENSION_PATTERN.search(line)
+        if round_match and number_match:
+            tickets.append({
+                'round': int(round_match.group(1)),
+                'group': int(number_match.group(1)),
+                'number': re.sub(r'\s', '', number_match.group(2)),
+            })
+
+    logger.info(f"{username}: Captured {len(tickets)} pension tickets from receipt")
+    return tickets
+
+
+def lotto_purchase_steps(ticket_count: int) -> list:
+    """Step table of the lotto 6/45 auto-number purchase"""
+    return [
+        flows.navigate('lotto purchase page', 'https://ol.dhlottery.co.kr/olotto/game/game645.do', 'game645'),
+        flows.click('auto number tab', 'auto_tab'),
+        flows.select('ticket count', 'ticket_count', ticket_count - 1),
+        flows.click('select numbers button', 'select_numbers'),
+        flows.click('buy button', 'buy_button'),
+        flows.confirm('confirm button', 'confirm_button'),
+        flows.verify('purchase result', {'kind': 'lotto', 'ticket_count': ticket_count}),
+    ]
 
-    try:
-        driver = get_chrome_driver()
-        login_lotto(driver, username, password)
 
-        # Navigate directly to lotto purchase page (same as working local code)
-        logger.info(f"{username}: Navigating to lotto purchase page...")
-        driver.get('https://ol.dhlottery.co.kr/olotto/game/game645.do')
-        time.sleep(5)
+def pension_reservation_steps(ticket_count: int) -> list:
+    """Step table of the pension 720+ reservation purchase"""
+    return [
+        flows.navigate('pension purchase page', 'https://el.dhlottery.co.kr/game/TotalGame.jsp?LottoId=LP72', 'pension'),
+        flows.switch_frame('game iframe', 'game_frame', 'pension_frame'),
+        flows.click('reservation tab', 'reservation_tab'),
+        flows.select('ticket count', 'ticket_count', ticket_count - 1),
+        flows.click('buy button', 'buy_button'),
+        flows.confirm('confirm button', 'confirm_button'),
+        flows.verify('purchase result', {'kind': 'pension', 'ticket_count': ticket_count}),
+    ]
+
+
+def verify_purchase(driver, username: str, kind: str, ticket_count: int) -> dict:
+    """Capture the receipt and build the purchase result from the page"""
+    # Capture purchased numbers from the receipt in the same session
+    if kind == 'pension':
+        tickets = capture_pension_receipt(driver, username)
+        add_pension_tickets(username, tickets)
+    else:
+        tickets = capture_lotto_receipt(driver, username)
+        add_lotto_tickets(username, tickets)
+
+    # Check for purchase result
+    page_source = driver.page_source
+    if '구매완료' in page_source or '복권이 구매' in page_source or '구매가 완료' in page_source:
+        message = f"{username}: Successfully purchased {ticket_count} lotto tickets"
+        logger.info(message)
+        return {
+            'status': 'success',
+            'message': message,
+            'username': username,
+            'ticket_count': ticket_count,
+            'tickets': tickets
+        }
+    elif '잔액이 부족' in page_source or '잔고가 부족' in page_source:
+        message = f"{username}: Insufficient balance"
+        logger.error(message)
+        return {
+            'status': 'error',
+            'message': message,
+            'username': username,
+            'error': 'Insufficient balance'
+        }
+    else:
+        # Log for debugging
+        logger.info(f"{username}: Page source snippet: {page_source[:500]}")
+        message = f"{username}: Purchase completed (unverified)"
+        logger.info(message)
+        return {
+            'status': 'success',
+            'message': message,
+            'username': username,
+            'ticket_count': ticket_count,
+            'tickets': tickets
+        }
+
+
+def run_purchase_step(driver, username: str, step: dict):
+    """Execute one step of a purchase flow"""
+    action = step['action']
+    logger.info(f"{username}: {step['name']}...")
+
+    if action == 'navigate':
+        driver.switch_to.default_content()
+        open_page(driver, step['target'], username)
+        time.sleep(step['wait'])
         logger.info(f"{username}: Page loaded. URL: {driver.current_url}, Title: {driver.title}")
 
         # Check and close any initial popup
         popup_text = close_popup_if_exists(driver, username)
         if popup_text and ('로그인' in popup_text or '세션' in popup_text):
-            raise Exception(f"Login required: {popup_text}")
+            raise FlowAbort(f"Login required: {popup_text}")
 
-        # Click auto number tab (same xpath as working code)
-        logger.info(f"{username}: Clicking auto number tab...")
-        auto_tab = wait_for_element(driver, By.XPATH, '//*[@id="tabWay2Buy"]/li[2]')
-        auto_tab.click()
-        logger.info(f"{username}: Clicked auto number tab")
-        time.sleep(1)
+        # Fail fast on a redesigned page instead of timing out on every selector
+        probe_page(driver, step['page'])
+        driver.top_page = driver.current_page = step['page']
 
-        # Close popup if appears after clicking tab
+    elif action == 'frame':
+        driver.switch_to.default_content()
+        iframe = find(driver, driver.top_page, step['target'])
+        driver.switch_to.frame(iframe)
+        probe_page(driver, step['page'])
+        driver.current_page = step['page']
+
+    elif action in ('click', 'confirm'):
+        find(driver, driver.current_page, step['target']).click()
+        time.sleep(step['wait'])
+        if action == 'click':
+            close_popup_if_exists(driver, username)
+
+    elif action == 'select':
+        select_element = find(driver, driver.current_page, step['target'])
+        Select(select_element).select_by_index(step['value'])
         close_popup_if_exists(driver, username)
 
-        # Select ticket count
-        logger.info(f"{username}: Selecting {ticket_count} tickets...")
-        select_element = wait_for_element(driver, By.XPATH, '//*[@id="amoundApply"]')
-        select = Select(select_element)
-        select.select_by_index(ticket_count - 1)
-        logger.info(f"{username}: Selected {ticket_count} tickets")
-
-        # Click select numbers button
-        logger.info(f"{username}: Clicking select numbers button...")
-        wait_for_element(driver, By.XPATH, '//*[@id="btnSelectNum"]').click()
-        logger.info(f"{username}: Clicked select numbers button")
-        time.sleep(1)
+    elif action == 'verify':
+        return verify_purchase(driver, username, step['value']['kind'], step['value']['ticket_count'])
 
-        # Close popup if appears
-        close_popup_if_exists(driver, username)
+    else:
+        raise ValueError(f"Unknown step action: {action}")
 
-        # Click buy button
-        logger.info(f"{username}: Clicking buy button...")
-        wait_for_element(driver, By.XPATH, '//*[@id="btnBuy"]').click()
-        logger.info(f"{username}: Clicked buy button")
-        time.sleep(1)
+    logger.info(f"{username}: {step['name']} done")
 
-        # Close popup if appears
-        close_popup_if_exists(driver, username)
 
-        # Click confirm button in confirmation popup
-        logger.info(f"{username}: Clicking confirm button...")
-        wait_for_element(driver, By.XPATH, '//*[@id="popupLayerConfirm"]/div/div[2]/input[1]').click()
-        logger.info(f"{username}: Clicked confirm button")
-        time.sleep(5)
+def run_purchase(username: str, password: str, steps: list) -> dict:
+    """Log in and run a purchase step table in one browser session"""
+    driver = None
 
-        # Check for purchase result
-        page_source = driver.page_source
-        if '구매완료' in page_source or '복권이 구매' in page_source or '구매가 완료' in page_source:
-            message = f"{username}: Successfully purchased {ticket_count} lotto tickets"
-            logger.info(message)
-            return {
-                'status': 'success',
-                'message': message,
-                'username': username,
-                'ticket_count': ticket_count
-            }
-        elif '잔액이 부족' in page_source or '잔고가 부족' in page_source:
-            message = f"{username}: Insufficient balance"
-            logger.error(message)
-            return {
-                'status': 'error',
-                'message': message,
-                'username': username,
-                'error': 'Insufficient balance'
-            }
-        else:
-            # Log for debugging
-            logger.info(f"{username}: Page source snippet: {page_source[:500]}")
-            message = f"{username}: Purchase completed (unverified)"
-            logger.info(message)
-            return {
-                'status': 'success',
-                'message': message,
-                'username': username,
-                'ticket_count': ticket_count
-            }
+    try:
+        driver = get_chrome_driver()
+        login_lotto(driver, username, password)
+
+        outcome = run_flow(driver, username, steps, run_purchase_step, recover=close_popup_if_exists)
+        if outcome['retries'] or outcome['resumes']:
+            logger.info(f"{username}: Flow recovered with {outcome['retries']} step retries, {outcome['resumes']} resumes")
+        return outcome['result']
 
     except Exception as e:
         message = f"{username}: Failed to purchase lotto tickets - {str(e)}"
@@ -379,16 +719,34 @@ def buy_lotto_ticket(username: str, password: str, ticket_count: int = 5) -> dic
             except Exception:
                 pass
 
-        return {
+        result = {
             'status': 'error',
             'message': message,
             'username': username,
             'error': str(e)
         }
+        if isinstance(e, FlowError):
+            result['failed_step'] = e.step['name']
+        return result
 
     finally:
         if driver:
-            driver.quit()
+            quit_driver(driver)
+
+
+def buy_lotto_ticket(username: str, password: str, ticket_count: int = 5) -> dict:
+    """
+    Buy lotto tickets
+
+    Args:
+        username: dhlottery.co.kr username
+        password: dhlottery.co.kr password
+        ticket_count: Number of tickets to buy (1-5)
+
+    Returns:
+        dict with status and message
+    """
+    return run_purchase(username, password, lotto_purchase_steps(ticket_count))
 
 
 def check_lotto_balance(username: str, password: str) -> dict:
@@ -403,10 +761,11 @@ def check_lotto_balance(username: str, password: str) -> dict:
         driver = get_chrome_driver()
         login_lotto(driver, username, password)
 
-        driver.get('https://www.dhlottery.co.kr/mypage/home')
+        open_page(driver, 'https://www.dhlottery.co.kr/mypage/home', username)
         time.sleep(5)
 
-        element = driver.find_element(By.XPATH, '//*[@id="divCrntEntrsAmt"]')
+        probe_page(driver, 'mypage')
+        element = find(driver, 'mypage', 'balance')
         balance_text = element.text.strip()
         balance = int(balance_text.replace("원", "").replace(",", ""))
 
@@ -439,54 +798,61 @@ def check_lotto_balance(username: str, password: str) -> dict:
 
     finally:
         if driver:
-            driver.quit()
+            quit_driver(driver)
 
 
-def check_lotto_result(username: str, password: str) -> dict:
-    """Check lotto results"""
-    driver = None
-
-    try:
-        driver = get_chrome_driver()
-        login_lotto(driver, username, password)
+def format_ticket_match(match: dict) -> str:
+    """One-line description of a matched ticket"""
+    label = f"{match['round']}회 {match.get('slot', '')}".strip()
+    numbers = ' '.join(f"{n:02d}" for n in match['numbers'])
+    if not match['drawn']:
+        return f"{label} [{numbers}]: 미추첨"
+    if match['rank'] is None:
+        return f"{label} [{numbers}]: 낙첨 ({match['matched']}개 일치)"
+    prize = f", {match['prize']:,}원" if match['prize'] else ''
+    return f"{label} [{numbers}]: {match['rank']}등 당첨{prize}"
 
-        driver.get('https://www.dhlottery.co.kr/mypage/mylotteryledger')
-        time.sleep(5)
 
-        # Click 1 Month button
-        # wait_for_element(driver, By.XPATH, '//*[@id="containerBox"]/div[2]/div/div/div/form/div[1]/div/div[2]/div/div/div[2]/div[2]/button[3]').click()
-        # time.sleep(1)
-
-        # Click search button
-        wait_for_element(driver, By.XPATH, '//*[@id="btnSrch"]').click()
+def check_lotto_result_local(username: str, tickets: list) -> dict:
+    """
+    Check lotto results by matching known tickets against cached draw results
 
-        # Wait for search results to load after button click
-        time.sleep(3)
+    No browser session is needed; draw results are shared by all accounts.
 
-        # Wait for the result list container to be present
-        wait = WebDriverWait(driver, 10)
-        try:
-            wait.until(EC.presence_of_element_located((By.XPATH, '//*[@id="winning-history-list"]')))
-        except Exception:
-            logger.info(f"{username}: Result list not found, may be empty")
+    Args:
+        username: dhlottery.co.kr username
+        tickets: list of dicts with 'round', 'slot' and 'numbers'
 
-        # Re-fetch elements and extract text in a stale-safe manner
-        results = []
-        result_elements = driver.find_elements(By.XPATH, '//*[@id="winning-history-list"]/ul[2]/li/div[6]/span[2]')
-        for i in range(len(result_elements)):
-            try:
-                # Re-find element each time to avoid stale reference
-                elem = driver.find_elements(By.XPATH, '//*[@id="winning-history-list"]/ul[2]/li/div[6]/span[2]')[i]
-                results.append(elem.text.strip())
-            except Exception as e:
-                logger.warning(f"{username}: Failed to get result text at index {i}: {e}")
-                continue
+    Returns:
+        dict with status, message and per-ticket matches; status is 'error'
+        if the result of an already drawn round could not be fetched
+    """
+    try:
+        matches = match_tickets(tickets)
 
-        has_winning = any("당첨" in result for result in results)
+        # A failed draw fetch must not read as "no winning tickets"
+        latest = latest_drawn_round()
+        missing = sorted({match['round'] for match in matches if not match['drawn'] and match['round'] <= latest})
+        if missing:
+            message = f"{username}: Draw results unavailable for round(s) {', '.join(map(str, missing))}"
+            logger.error(message)
+            return {
+                'status': 'error',
+                'message': message,
+                'username': username,
+                'error': 'Draw results unavailable'
+            }
+        results = [format_ticket_match(match) for match in matches]
+        winning = [match for match in matches if match['rank']]
+        has_winning = bool(winning)
 
         if has_winning:
-            message = f"{username}: Found winning ticket!"
-            send_winning_notification(username)
+            best = min(match['rank'] for match in winning)
+            message = f"{username}: Found {len(winning)} winning ticket(s)! (best: {best}등)"
+            send_winning_notification(username, [
+                (format_ticket_match(match), f"lotto:{match['round']}:{match['slot']}:{''.join(f'{n:02d}' for n in match['numbers'])}")
+                for match in winning
+            ])
         else:
             message = f"{username}: No winning tickets"
 
@@ -497,7 +863,8 @@ def check_lotto_result(username: str, password: str) -> dict:
             'message': message,
             'username': username,
             'has_winning': has_winning,
-            'results': results
+            'results': results,
+            'matches': matches
         }
 
     except Exception as e:
@@ -511,122 +878,104 @@ def check_lotto_result(username: str, password: str) -> dict:
             'error': str(e)
         }
 
-    finally:
-        if driver:
-            driver.quit()
-
 
-def buy_pension_lotto(username: str, password: str, ticket_count: int = 5) -> dict:
+def check_lotto_result(username: str, password: str, tickets: list = None, reconcile: bool = False) -> dict:
     """
-    Buy pension lotto tickets (simplified version matching local working code)
+    Check lotto results
 
     Args:
         username: dhlottery.co.kr username
         password: dhlottery.co.kr password
-        ticket_count: Number of tickets to buy (1-5)
+        tickets: Known purchased tickets; when given, results are matched
+                 locally without a browser session (the ledger is scraped
+                 if a drawn round's result cannot be fetched)
+        reconcile: Also scrape the purchase ledger and compare with the local match
 
     Returns:
         dict with status and message
     """
+    if tickets and not reconcile:
+        result = check_lotto_result_local(username, tickets)
+        if result['status'] != 'error':
+            return result
+        logger.warning(f"{username}: Local result check failed, falling back to the purchase ledger")
+
     driver = None
 
     try:
         driver = get_chrome_driver()
         login_lotto(driver, username, password)
 
-        # Navigate directly to lotto purchase page (same as working local code)
-        logger.info(f"{username}: Navigating to lotto purchase page...")
-        driver.get('https://el.dhlottery.co.kr/game/TotalGame.jsp?LottoId=LP72')
+        open_page(driver, 'https://www.dhlottery.co.kr/mypage/mylotteryledger', username)
         time.sleep(5)
-        logger.info(f"{username}: Page loaded. URL: {driver.current_url}, Title: {driver.title}")
 
-        # Check and close any initial popup
-        popup_text = close_popup_if_exists(driver, username)
-        if popup_text and ('로그인' in popup_text or '세션' in popup_text):
-            raise Exception(f"Login required: {popup_text}")
-
-        iframe = wait_for_element(driver, By.XPATH, '//*[@id="ifrm_tab"]')
-        driver.switch_to.frame(iframe)
+        # Click search button
+        probe_page(driver, 'ledger')
+        find(driver, 'ledger', 'search_button').click()
 
-        # Click reservation tab (same xpath as working code)
-        logger.info(f"{username}: Clicking reservation tab...")
+        # Wait for search results to load after button click
+        time.sleep(3)
 
-        auto_tab = wait_for_element(driver, By.XPATH, '//*[@id="frm"]/div/ul[1]/li[3]/a')
-        auto_tab.click()
-        logger.info(f"{username}: Clicked reservation tab")
-        time.sleep(1)
+        # Wait for the result list container to be present
+        try:
+            find(driver, 'ledger', 'history_list')
+        except Exception:
+            logger.info(f"{username}: Result list not found, may be empty")
 
-        # Close popup if appears after clicking tab
-        close_popup_if_exists(driver, username)
+        # Re-fetch elements and extract text in a stale-safe manner
+        results = []
+        rows = []
+        result_elements = find_all(driver, 'ledger', 'result_cells')
+        for i in range(len(result_elements)):
+            try:
+                # Re-find element each time to avoid stale reference
+                elem = find_all(driver, 'ledger', 'result_cells')[i]
+                results.append(elem.text.strip())
+                # Whole ledger row (date, game, round, number) identifies the ticket
+                row_elements = find_all(driver, 'ledger', 'result_rows')
+                rows.append(' '.join(row_elements[i].text.split()) if i < len(row_elements) else results[-1])
+            except Exception as e:
+                logger.warning(f"{username}: Failed to get result text at index {i}: {e}")
+                continue
 
-        # Select ticket count
-        logger.info(f"{username}: Selecting {ticket_count} tickets...")
-        select_element = wait_for_element(driver, By.XPATH, '//*[@id="repeatRound"]')
-        select = Select(select_element)
-        select.select_by_index(ticket_count - 1)
-        logger.info(f"{username}: Selected {ticket_count} tickets")
+        has_winning = any("당첨" in result for result in results)
 
-        # Close popup if appears
-        close_popup_if_exists(driver, username)
+        if has_winning:
+            message = f"{username}: Found winning ticket!"
+            wins = []
+            for row, result in zip(rows, results):
+                if "당첨" in result:
+                    # Identical rows (same ticket twice) stay distinct
+                    identity = f"ledger:{row}#{sum(1 for win in wins if win[0] == row)}"
+                    wins.append((row, identity))
+            send_winning_notification(username, wins)
+        else:
+            message = f"{username}: No winning tickets"
 
-        # Click buy button
-        logger.info(f"{username}: Clicking buy button...")
-        wait_for_element(driver, By.XPATH, '//*[@id="tab2"]/ul/li[5]/a').click()
-        logger.info(f"{username}: Clicked buy button")
-        time.sleep(1)
+        logger.info(message)
 
-        # Close popup if appears
-        close_popup_if_exists(driver, username)
+        result = {
+            'status': 'success',
+            'message': message,
+            'username': username,
+            'has_winning': has_winning,
+            'results': results
+        }
 
-        # Click confirm button in confirmation popup
-        logger.info(f"{username}: Clicking confirm button...")
-        wait_for_element(driver, By.XPATH, '//*[@id="resevationConfirm"]/div/div[3]/a[1]').click()
-        logger.info(f"{username}: Clicked confirm button")
-        time.sleep(5)
+        # Reconcile the ledger with locally matched tickets
+        if tickets:
+            matches = match_tickets(tickets)
+            local_has_winning = any(match['rank'] for match in matches)
+            if local_has_winning != has_winning:
+                logger.warning(f"{username}: Ledger ({has_winning}) and local match ({local_has_winning}) disagree on winning")
+            result['matches'] = matches
 
-        # Check for purchase result
-        page_source = driver.page_source
-        if '구매완료' in page_source or '복권이 구매' in page_source or '구매가 완료' in page_source:
-            message = f"{username}: Successfully purchased {ticket_count} lotto tickets"
-            logger.info(message)
-            return {
-                'status': 'success',
-                'message': message,
-                'username': username,
-                'ticket_count': ticket_count
-            }
-        elif '잔액이 부족' in page_source or '잔고가 부족' in page_source:
-            message = f"{username}: Insufficient balance"
-            logger.error(message)
-            return {
-                'status': 'error',
-                'message': message,
-                'username': username,
-                'error': 'Insufficient balance'
-            }
-        else:
-            # Log for debugging
-            logger.info(f"{username}: Page source snippet: {page_source[:500]}")
-            message = f"{username}: Purchase completed (unverified)"
-            logger.info(message)
-            return {
-                'status': 'success',
-                'message': message,
-                'username': username,
-                'ticket_count': ticket_count
-            }
+        return result
 
     except Exception as e:
-        message = f"{username}: Failed to purchase lotto tickets - {str(e)}"
+        message = f"{username}: Failed to check results - {str(e)}"
         logger.error(message)
 
-        if driver:
-            try:
-                logger.error(f"{username}: Debug - Current URL: {driver.current_url}")
-                logger.error(f"{username}: Debug - Page title: {driver.title}")
-            except Exception:
-                pass
-
         return {
             'status': 'error',
             'message': message,
@@ -636,7 +985,22 @@ def buy_pension_lotto(username: str, password: str, ticket_count: int = 5) -> di
 
     finally:
         if driver:
-            driver.quit()
+            quit_driver(driver)
+
+
+def buy_pension_lotto(username: str, password: str, ticket_count: int = 5) -> dict:
+    """
+    Buy pension lotto tickets
+
+    Args:
+        username: dhlottery.co.kr username
+        password: dhlottery.co.kr password
+        ticket_count: Number of tickets to buy (1-5)
+
+    Returns:
+        dict with status and message
+    """
+    return run_purchase(username, password, pension_reservation_steps(ticket_count))
 
 
 def check_pension_lotto_reservation(username: str, password: str) -> dict:
@@ -653,12 +1017,12 @@ def check_pension_lotto_reservation(username: str, password: str) -> dict:
     driver = None
 
     try:
-        driver = webdriver.Chrome()
+        driver = get_chrome_driver()
         login_lotto(driver, username, password)
 
         # Navigate directly to lotto purchase page (same as working local code)
         logger.info(f"{username}: Navigating to lotto purchase page...")
-        driver.get('https://el.dhlottery.co.kr/game/TotalGame.jsp?LottoId=LP72')
+        open_page(driver, 'https://el.dhlottery.co.kr/game/TotalGame.jsp?LottoId=LP72', username)
         time.sleep(5)
         logger.info(f"{username}: Page loaded. URL: {driver.current_url}, Title: {driver.title}")
 
@@ -667,13 +1031,15 @@ def check_pension_lotto_reservation(username: str, password: str) -> dict:
         if popup_text and ('로그인' in popup_text or '세션' in popup_text):
             raise Exception(f"Login required: {popup_text}")
 
-        iframe = wait_for_element(driver, By.XPATH, '//*[@id="ifrm_tab"]')
+        probe_page(driver, 'pension')
+        iframe = find(driver, 'pension', 'game_frame')
         driver.switch_to.frame(iframe)
         time.sleep(1)
+        probe_page(driver, 'pension_frame')
 
-        # Click reservation tab (same xpath as working code)
+        # Click reservation tab
         logger.info(f"{username}: Clicking reservation tab...")
-        auto_tab = wait_for_element(driver, By.XPATH, '//*[@id="frm"]/div/ul[1]/li[3]/a')
+        auto_tab = find(driver, 'pension_frame', 'reservation_tab')
         auto_tab.click()
         logger.info(f"{username}: Clicked reservation tab")
         time.sleep(1)
@@ -682,9 +1048,9 @@ def check_pension_lotto_reservation(username: str, password: str) -> dict:
         close_popup_if_exists(driver, username)
 
         # Select ticket count
-        wait_for_element(driver, By.XPATH, '//*[@id="tab2"]/div[1]/div[1]/div[2]/a[5]').click()
-        wait_for_element(driver, By.XPATH, '//*[@id="tab2"]/div[1]/div[1]/div[1]/a').click()
-        pension_lottery_ticket_status = wait_for_element(driver, By.XPATH, '//*[@id="tab2"]/div[1]/div[2]/ul/li[1]/span[1]').text.strip()
+        find(driver, 'pension_frame', 'period_all').click()
+        find(driver, 'pension_frame', 'search_button').click()
+        pension_lottery_ticket_status = find(driver, 'pension_frame', 'reservation_status').text.strip()
         logging.info(f"{username}: Pension lottery ticket status: {pension_lottery_ticket_status}")
 
         if '예약중' in pension_lottery_ticket_status:
@@ -723,4 +1089,4 @@ def check_pension_lotto_reservation(username: str, password: str) -> dict:
 
     finally:
         if driver:
-            driver.quit()
+            quit_driver(driver)
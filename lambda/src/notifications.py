@@ -0,0 +1,204 @@
+"""
+Notification Digest Utility
+Collects notification events during an invocation and publishes them as SNS digests
+"""
+import os
+import time
+import hashlib
+import logging
+import threading
+import boto3
+from config import env_float
+from state_store import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+# SNS limits: 256 KB message, 100 character email subject
+MAX_MESSAGE_BYTES = 250 * 1024
+MAX_SUBJECT_LENGTH = 100
+
+# Event kinds in digest order
+ERROR = 'error'
+WINNING = 'winning'
+LOW_BALANCE = 'low_balance'
+SUMMARY = 'summary'
+
+SECTION_TITLES = {
+    ERROR: 'Errors',
+    WINNING: 'Winning Tickets',
+    LOW_BALANCE: 'Low Balance - Recharge Required',
+    SUMMARY: 'Results',
+}
+
+# Kinds deduplicated across runs (same account + fingerprint is sent once per TTL)
+DEDUP_KINDS = (WINNING, LOW_BALANCE)
+
+STATE_FILE = '/tmp/lotto-notification-state.json'
+STATE_S3_KEY = 'notifications/state.json'
+
+# Singleton SNS client
+_sns_client = None
+
+
+def get_sns_client():
+    """Get or create SNS client"""
+    global _sns_client
+    if _sns_client is None:
+        _sns_client = boto3.client('sns')
+    return _sns_client
+
+
+def publish(topic_arn: str, subject: str, message: str) -> bool:
+    """Publish a single SNS message, returns True on success"""
+    try:
+        get_sns_client().publish(
+            TopicArn=topic_arn,
+            Subject=subject[:MAX_SUBJECT_LENGTH],
+            Message=message
+        )
+        logger.info(f"Notification sent: {subject}")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to send notification: {e}")
+        return False
+
+
+def _dedup_ttl() -> float:
+    """Seconds a deduplicated event is suppressed (NOTIFICATION_DEDUP_TTL_HOURS, default: 720)"""
+    return env_float('NOTIFICATION_DEDUP_TTL_HOURS', 720.0) * 3600
+
+
+def load_dedup_state() -> dict:
+    """Load dedup state from NOTIFICATION_STATE_BUCKET (if set) or the local state file"""
+    return load_json(os.environ.get('NOTIFICATION_STATE_BUCKET'), STATE_S3_KEY, STATE_FILE, {}, 'notification state')
+
+
+def save_dedup_state(state: dict):
+    """Persist dedup state, dropping expired entries"""
+    now = time.time()
+    ttl = _dedup_ttl()
+    state = {key: sent_at for key, sent_at in state.items() if now - sent_at < ttl}
+    save_json(os.environ.get('NOTIFICATION_STATE_BUCKET'), STATE_S3_KEY, STATE_FILE, state, 'notification state')
+
+
+class NotificationCollector:
+    """
+    Per-invocation collector of notification events
+
+    Events are grouped by kind into one digest (split into several messages
+    only when exceeding the SNS size limit) and published by flush().
+    """
+
+    def __init__(self):
+        self.events = []
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, username: str, text: str, fingerprint: str = None):
+        """
+        Record an event
+
+        Args:
+            kind: ERROR, WINNING, LOW_BALANCE or SUMMARY
+            username: Account the event belongs to (None for run-level events)
+            text: Line(s) shown in the digest
+            fingerprint: Identity of the event for deduplication (defaults to text)
+        """
+        fingerprint = fingerprint if fingerprint is not None else text
+        key = f"{kind}:{username}:{hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]}"
+        with self._lock:
+            if key in self._seen:
+                return
+            self._seen.add(key)
+            self.events.append({'kind': kind, 'username': username, 'text': text, 'key': key})
+
+    def has(self, kind: str) -> bool:
+        return any(event['kind'] == kind for event in self.events)
+
+    def _build_sections(self, events: list) -> list:
+        """Render events as digest lines grouped by kind"""
+        lines = []
+        for kind in (ERROR, WINNING, LOW_BALANCE, SUMMARY):
+            kind_events = [event for event in events if event['kind'] == kind]
+            if not kind_events:
+                continue
+            title = SECTION_TITLES[kind]
+            lines.append(f"== {title} ==")
+            for event in kind_events:
+                lines.append(event['text'])
+            lines.append('')
+        return lines
+
+    def _split(self, header: str, lines: list) -> list:
+        """Pack lines into messages that stay under MAX_MESSAGE_BYTES"""
+        messages = []
+        current = header
+        for line in lines:
+            candidate = f"{current}{line}\n"
+            if len(candidate.encode('utf-8')) > MAX_MESSAGE_BYTES and current != header:
+                messages.append(current)
+                candidate = f"{header}{line}\n"
+            current = candidate
+        messages.append(current)
+        return messages
+
+    def flush(self, topic_arn: str, subject: str, header: str = '') -> int:
+        """
+        Publish collected events as digest(s) and reset the collector
+
+        Winning/low balance events already notified within the dedup TTL
+        are dropped.
+
+        Returns:
+            number of SNS messages published
+        """
+        with self._lock:
+            events, self.events = self.events, []
+            self._seen = set()
+
+        state = load_dedup_state()
+        now = time.time()
+        ttl = _dedup_ttl()
+        fresh = []
+        for event in events:
+            if event['kind'] in DEDUP_KINDS:
+                sent_at = state.get(event['key'])
+                if sent_at and now - sent_at < ttl:
+                    logger.info(f"Skipping duplicate {event['kind']} notification for {event['username']}")
+                    continue
+            fresh.append(event)
+
+        if not fresh:
+            logger.info("No notifications to send")
+            return 0
+
+        messages = self._split(header, self._build_sections(fresh))
+        sent = 0
+        for i, message in enumerate(messages):
+            part_subject = subject if len(messages) == 1 else f"{subject} ({i + 1}/{len(messages)})"
+            if publish(topic_arn, part_subject, message):
+                sent += 1
+
+        if sent == len(messages):
+            for event in fresh:
+                if event['kind'] in DEDUP_KINDS:
+                    state[event['key']] = now
+            save_dedup_state(state)
+
+        return sent
+
+
+# Collector of the current invocation
+_collector = NotificationCollector()
+
+
+def get_collector() -> NotificationCollector:
+    """Get the collector of the current invocation"""
+    return _collector
+
+
+def reset_collector() -> NotificationCollector:
+    """Start a fresh collector for a new invocation"""
+    global _collector
+    _collector = NotificationCollector()
+    return _collector
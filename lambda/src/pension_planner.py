@@ -0,0 +1,102 @@
+"""
+Pension 720+ Reservation Planner
+Decides per account whether this week needs a reservation and for how many rounds
+"""
+import logging
+from datetime import datetime
+from config import KST, env_int
+from ticket_store import get_pension_rounds, add_pension_reservation
+
+logger = logging.getLogger(__name__)
+
+# Pension 720+ round 1 was drawn on 2020-05-07 (Thursday) at about 19:05 KST
+FIRST_PENSION_DRAW = datetime(2020, 5, 7, 19, 5, tzinfo=KST)
+
+PENSION_PRICE = 1000
+LOTTO_PRICE = 1000
+
+# Options of the site's repeatRound select
+MAX_RESERVE_ROUNDS = 5
+
+# Default weekly budget (KRW) - can be overridden by Secrets Manager (weeklyBudget)
+# 5 lotto tickets + a full batch of MAX_RESERVE_ROUNDS pension rounds in a reservation week
+DEFAULT_WEEKLY_BUDGET = 10000
+
+
+def next_pension_round(now: datetime = None) -> int:
+    """Round number of the next pension 720+ draw"""
+    now = now or datetime.now(KST)
+    return (now - FIRST_PENSION_DRAW).days // 7 + 2
+
+
+def get_max_reserve_rounds() -> int:
+    """Largest batch reserved at once (PENSION_RESERVE_ROUNDS, default and maximum: 5)"""
+    return env_int('PENSION_RESERVE_ROUNDS', MAX_RESERVE_ROUNDS, minimum=1, maximum=MAX_RESERVE_ROUNDS)
+
+
+def covered_rounds(username: str, next_round: int) -> int:
+    """Number of consecutive rounds from next_round with a stored pension ticket or reservation"""
+    rounds = get_pension_rounds(username, min_round=next_round)
+    covered = 0
+    while next_round + covered in rounds:
+        covered += 1
+    return covered
+
+
+def plan_pension(username: str, balance: int = None, weekly_budget: int = DEFAULT_WEEKLY_BUDGET,
+                 lotto_tickets: int = 5, now: datetime = None) -> dict:
+    """
+    Plan this week's pension reservation for an account
+
+    Rounds already reserved through this automation are known from the
+    ticket store, so covered weeks need no browser session at all. When the
+    next round is not covered, a batch of rounds (one ticket each) is paid
+    up front, so the weekly budget is what a reservation week may spend:
+
+        rounds <= (weekly_budget - lotto) // PENSION_PRICE
+
+    The balance (after this week's lotto) must also keep the lotto of every
+    following week the batch covers:
+
+        rounds * PENSION_PRICE + (rounds - 1) * lotto <= balance
+
+    Args:
+        balance: Current balance (KRW), None if unknown
+        weekly_budget: Most an account may spend in one week (KRW), lotto and pension together
+        lotto_tickets: Lotto tickets bought per week
+
+    Returns:
+        dict with status, message, username, 'rounds' to reserve (0 = skip)
+        and 'next_round'
+    """
+    next_round = next_pension_round(now)
+    lotto_weekly = lotto_tickets * LOTTO_PRICE
+    week_cost = lotto_weekly + PENSION_PRICE
+    result = {'status': 'success', 'username': username, 'rounds': 0, 'next_round': next_round}
+
+    covered = covered_rounds(username, next_round)
+    budget_rounds = (weekly_budget - lotto_weekly) // PENSION_PRICE
+    if covered:
+        result['message'] = f"{username}: Pension reserved through round {next_round + covered - 1}, skipping"
+    elif budget_rounds < 1:
+        result['message'] = f"{username}: Weekly budget {weekly_budget:,}원 leaves nothing for pension, skipping"
+    else:
+        rounds = min(get_max_reserve_rounds(), budget_rounds)
+        if balance is not None:
+            rounds = min(rounds, (balance + lotto_weekly) // week_cost)
+        if rounds < 1:
+            result['message'] = f"{username}: Balance {balance:,}원 is too low for a pension reservation, skipping"
+        else:
+            result['rounds'] = rounds
+            result['message'] = (
+                f"{username}: Planning pension reservation of {rounds} rounds from round {next_round} "
+                f"({rounds * PENSION_PRICE:,}원 of {weekly_budget:,}원 budget)"
+            )
+
+    logger.info(result['message'])
+    return result
+
+
+def record_reservation(username: str, plan: dict):
+    """Record the planned rounds as covered after a reservation (made here or found on the site)"""
+    add_pension_reservation(username, plan['next_round'], plan['rounds'])
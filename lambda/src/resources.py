@@ -0,0 +1,357 @@
+"""
+Container Resource Manager
+Keeps Chrome's /tmp footprint within a budget and reaps leaked browser processes in warm containers
+"""
+import os
+import json
+import time
+import shutil
+import signal
+import logging
+import threading
+from config import env_int
+
+logger = logging.getLogger(__name__)
+
+TMP_DIR = '/tmp'
+CRASH_DIR = '/tmp/chrome-crashes'
+
+# /tmp entries owned by Chrome (profiles, crash dumps, temp files) and trace output.
+# Ticket, session, draw and notification state is never evicted.
+EVICTABLE_PREFIXES = ('chrome-', '.com.google.Chrome', '.org.chromium.', 'lotto-traces')
+
+CHROME_PROCESS_NAMES = ('chrome', 'chromedriver', 'chrome_crashpad')
+
+# Default /tmp budget for evictable entries (Lambda ephemeral storage defaults to 512 MB)
+DEFAULT_TMP_BUDGET_MB = 256
+
+REAP_GRACE_SECONDS = 3
+
+METRICS_NAMESPACE = 'LottoAutomation'
+
+# Profile directories and chromedriver PIDs of live WebDriver sessions
+_active_profiles = set()
+_active_pids = set()
+_active_lock = threading.Lock()
+
+
+def get_tmp_budget_bytes() -> int:
+    """Size budget of Chrome's /tmp entries (TMP_BUDGET_MB, default: 256)"""
+    return env_int('TMP_BUDGET_MB', DEFAULT_TMP_BUDGET_MB, minimum=0) * 1024 * 1024
+
+
+def register_driver(profile_dir: str = None, driver_pid: int = None):
+    """Protect a live session's profile and chromedriver from eviction and reaping"""
+    with _active_lock:
+        if profile_dir:
+            _active_profiles.add(os.path.realpath(profile_dir))
+        if driver_pid:
+            _active_pids.add(driver_pid)
+
+
+def unregister_driver(profile_dir: str = None, driver_pid: int = None):
+    """Release a session registered with register_driver"""
+    with _active_lock:
+        if profile_dir:
+            _active_profiles.discard(os.path.realpath(profile_dir))
+        if driver_pid:
+            _active_pids.discard(driver_pid)
+
+
+def _protected() -> tuple:
+    """Active profile dirs and PIDs, including the shared browser's"""
+    import browser_pool
+
+    with _active_lock:
+        profiles = set(_active_profiles)
+        pids = set(_active_pids)
+    browser = browser_pool.get_running_browser()
+    if browser is not None:
+        if browser.profile_dir:
+            profiles.add(os.path.realpath(browser.profile_dir))
+        if browser.process is not None:
+            pids.add(browser.process.pid)
+    return profiles, pids
+
+
+def path_size(path: str) -> int:
+    """Size of a file or directory tree in bytes"""
+    if os.path.islink(path):
+        return 0
+    if os.path.isfile(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _last_used(path: str) -> float:
+    """Newest mtime of an entry (directories are as recent as their newest file)"""
+    try:
+        newest = os.path.getmtime(path)
+    except OSError:
+        return 0.0
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+                except OSError:
+                    pass
+    return newest
+
+
+def _evictable_entries() -> list:
+    """Evictable /tmp entries; crash dumps count one by one so old dumps go first"""
+    entries = []
+    for name in os.listdir(TMP_DIR):
+        path = os.path.join(TMP_DIR, name)
+        if not name.startswith(EVICTABLE_PREFIXES):
+            continue
+        if path == CRASH_DIR and os.path.isdir(path):
+            entries.extend(os.path.join(path, dump) for dump in os.listdir(path))
+            continue
+        entries.append(path)
+    return entries
+
+
+def enforce_tmp_budget(budget_bytes: int = None) -> dict:
+    """
+    Evict least recently used Chrome /tmp entries until they fit the budget
+
+    Profiles of live sessions and of the shared browser are never evicted.
+
+    Returns:
+        dict with 'tmp_bytes' (after eviction), 'evicted' and 'evicted_bytes'
+    """
+    budget = get_tmp_budget_bytes() if budget_bytes is None else budget_bytes
+    protected, _ = _protected()
+
+    entries = []
+    total = 0
+    for path in _evictable_entries():
+        size = path_size(path)
+        total += size
+        if os.path.realpath(path) not in protected:
+            entries.append((_last_used(path), path, size))
+
+    evicted = 0
+    evicted_bytes = 0
+    for _, path, size in sorted(entries):
+        if total <= budget:
+            break
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"Failed to evict {path}: {e}")
+            continue
+        total -= size
+        evicted += 1
+        evicted_bytes += size
+
+    if evicted:
+        logger.info(f"Evicted {evicted} /tmp entries ({evicted_bytes // 1024:,} KB), {total // 1024:,} KB left")
+    return {'tmp_bytes': total, 'evicted': evicted, 'evicted_bytes': evicted_bytes}
+
+
+def read_processes() -> dict:
+    """Read pid -> (name, state, ppid, rss_kb) from /proc"""
+    processes = {}
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                fields = dict(line.split(':', 1) for line in f if ':' in line)
+        except OSError:
+            continue
+        rss = fields.get('VmRSS', '0 kB').split()[0]
+        processes[int(pid)] = (
+            fields.get('Name', '').strip(),
+            fields.get('State', '').strip()[:1],
+            int(fields.get('PPid', '0').strip()),
+            int(rss),
+        )
+    return processes
+
+
+def chrome_processes(processes: dict = None) -> dict:
+    """Return pid -> state for Chrome-related processes"""
+    processes = read_processes() if processes is None else processes
+    return {
+        pid: state
+        for pid, (name, state, _, _) in processes.items()
+        if name.startswith(CHROME_PROCESS_NAMES)
+    }
+
+
+def _cmdline(pid: int) -> list:
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return [arg.decode('utf-8', 'replace') for arg in f.read().split(b'\0') if arg]
+    except OSError:
+        return []
+
+
+def _profile_dir(pid: int):
+    """--user-data-dir of a Chrome process, if it is one of ours under /tmp"""
+    for arg in _cmdline(pid):
+        if arg.startswith('--user-data-dir=/tmp/chrome-'):
+            return os.path.realpath(arg.split('=', 1)[1])
+    return None
+
+
+def _descendants(root: int, processes: dict) -> set:
+    children = {}
+    for pid, (_, _, ppid, _) in processes.items():
+        children.setdefault(ppid, []).append(pid)
+    found = set()
+    stack = [root]
+    while stack:
+        pid = stack.pop()
+        for child in children.get(pid, []):
+            if child not in found:
+                found.add(child)
+                stack.append(child)
+    return found
+
+
+def find_leaked_processes(processes: dict = None) -> set:
+    """
+    Chrome and chromedriver processes not belonging to a live session
+
+    Only processes this container started are considered: Chrome launched
+    with a /tmp/chrome-* profile (plus its helpers) and chromedriver
+    processes whose parent is this process or init (orphaned).
+    """
+    processes = read_processes() if processes is None else processes
+    protected_profiles, protected_pids = _protected()
+    own_pid = os.getpid()
+
+    keep = set()
+    for pid in protected_pids:
+        keep.add(pid)
+        keep |= _descendants(pid, processes)
+
+    leaked = set()
+    for pid, (name, state, ppid, _) in processes.items():
+        if pid in keep or state == 'Z':
+            continue
+        if name.startswith('chromedriver'):
+            descendants = _descendants(pid, processes)
+            # Orphans only count when they still drive one of our Chrome profiles
+            if ppid == own_pid or (ppid == 1 and any(_profile_dir(child) for child in descendants)):
+                leaked.add(pid)
+                leaked |= descendants
+        elif name.startswith('chrome'):
+            profile = _profile_dir(pid)
+            if profile is None:
+                continue
+            if profile in protected_profiles:
+                keep |= _descendants(pid, processes)
+                continue
+            leaked.add(pid)
+            leaked |= _descendants(pid, processes)
+    return leaked - keep
+
+
+def _reap_zombies(processes: dict) -> int:
+    """Collect exit status of our own defunct children"""
+    own_pid = os.getpid()
+    reaped = 0
+    for pid, (_, state, ppid, _) in processes.items():
+        if state == 'Z' and ppid == own_pid:
+            try:
+                os.waitpid(pid, os.WNOHANG)
+                reaped += 1
+            except ChildProcessError:
+                pass
+    return reaped
+
+
+def reap_chrome_processes() -> dict:
+    """
+    Kill leaked Chrome/chromedriver processes and collect zombies
+
+    Live sessions and the shared browser are exempt, so this is safe at the
+    start and end of an invocation.
+
+    Returns:
+        dict with 'chrome_processes' (left running), 'killed' and 'zombies_reaped'
+    """
+    processes = read_processes()
+    leaked = find_leaked_processes(processes)
+
+    for pid in leaked:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+    if leaked:
+        deadline = time.time() + REAP_GRACE_SECONDS
+        while time.time() < deadline and any(os.path.exists(f'/proc/{pid}') for pid in leaked):
+            _reap_zombies(read_processes())
+            time.sleep(0.1)
+        for pid in leaked:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+        logger.warning(f"Killed {len(leaked)} leaked Chrome/chromedriver processes")
+
+    processes = read_processes()
+    zombies = _reap_zombies(processes)
+    running = {
+        pid for pid, state in chrome_processes(processes).items()
+        if state != 'Z'
+    }
+    return {'chrome_processes': len(running), 'killed': len(leaked), 'zombies_reaped': zombies}
+
+
+def emit_metrics(phase: str, metrics: dict):
+    """
+    Write metrics as a CloudWatch Embedded Metric Format line
+
+    Lambda forwards stdout to CloudWatch Logs, which extracts the values
+    as metrics with the dimension Phase (start / end of an invocation).
+    """
+    names = sorted(metrics)
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['Phase']],
+                'Metrics': [
+                    {'Name': name, 'Unit': 'Bytes' if name.endswith('bytes') else 'Count'}
+                    for name in names
+                ],
+            }],
+        },
+        'Phase': phase,
+        **metrics,
+    }
+    print(json.dumps(record), flush=True)
+
+
+def housekeeping(phase: str) -> dict:
+    """Reap leaked processes, enforce the /tmp budget and emit metrics"""
+    metrics = {}
+    try:
+        metrics.update(reap_chrome_processes())
+        metrics.update(enforce_tmp_budget())
+        emit_metrics(phase, metrics)
+    except Exception as e:
+        logger.error(f"Housekeeping ({phase}) failed: {e}")
+    return metrics
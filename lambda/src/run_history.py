@@ -0,0 +1,253 @@
+"""
+Run History Archive
+Append-only, column-oriented segments with one row per account step and per run
+"""
+import os
+import json
+import math
+import zlib
+import time
+import struct
+import logging
+from datetime import datetime
+from config import KST
+from state_store import get_s3_client
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DIR = '/tmp/lotto-history'
+HISTORY_S3_PREFIX = 'history/'
+
+MAGIC = b'LOTTOCOL1'
+
+# Row schema; every segment stores each of these as its own compressed block
+COLUMNS = (
+    'ts',            # epoch seconds of the run start
+    'run_id',
+    'action',
+    'step',          # 'run' for the invocation row, otherwise the account step
+    'username',
+    'status',
+    'duration_s',
+    'balance',
+    'has_winning',
+    'ticket_count',
+    'failed_step',   # flow step that failed (purchase flows)
+    'error',
+)
+
+
+def _week(ts: float) -> str:
+    """ISO week partition of a timestamp (KST), e.g. '2025-W03'"""
+    year, week, _ = datetime.fromtimestamp(ts, KST).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def encode_segment(rows: list) -> bytes:
+    """
+    Encode rows as one segment
+
+    Layout: MAGIC, 4-byte header length, JSON header with the row count and
+    the (offset, length) of every column block, then one zlib-compressed
+    JSON array per column. Readers fetch the header and only the blocks of
+    the columns they need.
+    """
+    blocks = []
+    index = {}
+    offset = 0
+    for column in COLUMNS:
+        block = zlib.compress(json.dumps([row.get(column) for row in rows], separators=(',', ':')).encode('utf-8'))
+        index[column] = [offset, len(block)]
+        offset += len(block)
+        blocks.append(block)
+    header = json.dumps({'rows': len(rows), 'columns': index}, separators=(',', ':')).encode('utf-8')
+    return MAGIC + struct.pack('>I', len(header)) + header + b''.join(blocks)
+
+
+class LocalSource:
+    """Segments in a local directory"""
+
+    def __init__(self, root: str = HISTORY_DIR):
+        self.root = root
+
+    def list(self, week: str) -> list:
+        directory = os.path.join(self.root, week)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory))
+
+    def read(self, segment: str, offset: int, length: int) -> bytes:
+        with open(segment, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+
+class S3Source:
+    """Segments in an S3 bucket, read with ranged GETs"""
+
+    def __init__(self, bucket: str, prefix: str = HISTORY_S3_PREFIX):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = get_s3_client()
+
+    def list(self, week: str) -> list:
+        keys = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{self.prefix}{week}/"):
+            keys.extend(item['Key'] for item in page.get('Contents', []))
+        return sorted(keys)
+
+    def read(self, segment: str, offset: int, length: int) -> bytes:
+        response = self.client.get_object(
+            Bucket=self.bucket, Key=segment, Range=f"bytes={offset}-{offset + length - 1}"
+        )
+        return response['Body'].read()
+
+
+def read_segment(source, segment: str, columns: list) -> dict:
+    """Read only the given columns of a segment"""
+    prefix = source.read(segment, 0, len(MAGIC) + 4)
+    if prefix[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{segment} is not a history segment")
+    header_length = struct.unpack('>I', prefix[len(MAGIC):])[0]
+    header = json.loads(source.read(segment, len(prefix), header_length))
+    data_start = len(prefix) + header_length
+
+    result = {}
+    for column in columns:
+        if column not in header['columns']:
+            result[column] = [None] * header['rows']
+            continue
+        offset, length = header['columns'][column]
+        result[column] = json.loads(zlib.decompress(source.read(segment, data_start + offset, length)))
+    return result
+
+
+def scan(source, columns: list, weeks: int = 4, now: float = None) -> list:
+    """
+    Rows of the last N week partitions, restricted to the given columns
+
+    Returns:
+        list of dicts with one key per requested column
+    """
+    now = now or time.time()
+    partitions = sorted({_week(now - 7 * 86400 * i) for i in range(weeks)})
+    rows = []
+    for week in partitions:
+        for segment in source.list(week):
+            try:
+                data = read_segment(source, segment, columns)
+            except Exception as e:
+                logger.warning(f"Skipping history segment {segment}: {e}")
+                continue
+            rows.extend(dict(zip(columns, values)) for values in zip(*(data[c] for c in columns)))
+    return rows
+
+
+def build_rows(run_id: str, action: str, started_at: float, duration: float,
+               results: list, errors: list) -> list:
+    """One row for the run plus one per account step result"""
+    rows = [{
+        'ts': int(started_at),
+        'run_id': run_id,
+        'action': action,
+        'step': 'run',
+        'status': 'error' if errors else 'success',
+        'duration_s': round(duration, 2),
+        'error': '; '.join(errors)[:500] if errors else None,
+    }]
+    for result in results:
+        rows.append({
+            'ts': int(started_at),
+            'run_id': run_id,
+            'action': action,
+            'step': result.get('step'),
+            'username': result.get('username'),
+            'status': result.get('status'),
+            'duration_s': result.get('duration_s'),
+            'balance': result.get('balance'),
+            'has_winning': result.get('has_winning'),
+            'ticket_count': result.get('ticket_count'),
+            'failed_step': result.get('failed_step'),
+            'error': str(result['error'])[:500] if result.get('error') else None,
+        })
+    return rows
+
+
+def append_run(run_id: str, action: str, started_at: float, duration: float,
+               results: list, errors: list):
+    """
+    Append a run as a new segment (never rewrites existing data)
+
+    Segments are written to HISTORY_DIR and uploaded to HISTORY_S3_BUCKET
+    (under history/<ISO week>/) when it is set.
+    """
+    name = f"{_week(started_at)}/{time.strftime('%Y%m%dT%H%M%S', time.gmtime(started_at))}-{run_id}.col"
+    body = encode_segment(build_rows(run_id, action, started_at, duration, results, errors))
+
+    try:
+        path = os.path.join(HISTORY_DIR, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(body)
+    except OSError as e:
+        logger.error(f"Failed to write run history: {e}")
+
+    bucket = os.environ.get('HISTORY_S3_BUCKET')
+    if bucket:
+        try:
+            get_s3_client().put_object(Bucket=bucket, Key=HISTORY_S3_PREFIX + name, Body=body)
+        except Exception as e:
+            logger.error(f"Failed to upload run history to s3://{bucket}: {e}")
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def balance_trend(source, weeks: int = 4) -> dict:
+    """username -> [(ts, balance), ...] oldest first"""
+    trend = {}
+    for row in scan(source, ['ts', 'username', 'balance'], weeks):
+        if row['balance'] is not None and row['username']:
+            trend.setdefault(row['username'], []).append((row['ts'], row['balance']))
+    return {username: sorted(points) for username, points in sorted(trend.items())}
+
+
+def failure_rate_by_step(source, weeks: int = 4) -> dict:
+    """step -> {'runs', 'failures', 'rate', 'failed_steps'} over account steps"""
+    stats = {}
+    for row in scan(source, ['step', 'status', 'failed_step'], weeks):
+        if not row['step'] or row['step'] == 'run':
+            continue
+        entry = stats.setdefault(row['step'], {'runs': 0, 'failures': 0, 'failed_steps': {}})
+        entry['runs'] += 1
+        if row['status'] == 'error':
+            entry['failures'] += 1
+            if row['failed_step']:
+                entry['failed_steps'][row['failed_step']] = entry['failed_steps'].get(row['failed_step'], 0) + 1
+    for entry in stats.values():
+        entry['rate'] = round(entry['failures'] / entry['runs'], 3)
+    return dict(sorted(stats.items()))
+
+
+def duration_by_action(source, weeks: int = 4, pct: float = 95) -> dict:
+    """action -> {'runs', 'p50_s', 'pNN_s', 'max_s'} of whole invocations"""
+    durations = {}
+    for row in scan(source, ['action', 'step', 'duration_s'], weeks):
+        if row['step'] == 'run' and row['duration_s'] is not None:
+            durations.setdefault(row['action'], []).append(row['duration_s'])
+    return {
+        action: {
+            'runs': len(values),
+            'p50_s': percentile(values, 50),
+            f'p{int(pct)}_s': percentile(values, pct),
+            'max_s': max(values),
+        }
+        for action, values in sorted(durations.items())
+    }
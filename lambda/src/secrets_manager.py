@@ -3,12 +3,23 @@ AWS Secrets Manager Utility
 Retrieves credentials from AWS Secrets Manager
 """
 import json
+import time
+import threading
+from abc import ABC, abstractmethod
 import boto3
 from botocore.exceptions import ClientError
+from config import env_float
 
 # Singleton client
 _client = None
 
+# BatchGetSecretValue accepts at most 20 secret IDs per call
+BATCH_SIZE = 20
+
+# Parsed secret payloads, keyed by secret ID: (fetched_at, data)
+_secret_cache = {}
+_cache_lock = threading.Lock()
+
 
 def get_secrets_client():
     """Get or create Secrets Manager client"""
@@ -18,6 +29,255 @@ def get_secrets_client():
     return _client
 
 
+def set_secrets_client(client):
+    """Replace the Secrets Manager client (e.g., with a local in-memory stand-in)"""
+    global _client
+    _client = client
+    clear_secret_cache()
+
+
+def clear_secret_cache():
+    """Drop all cached secret payloads"""
+    with _cache_lock:
+        _secret_cache.clear()
+
+
+def _cache_ttl() -> float:
+    """Seconds a fetched secret is reused within a warm container (SECRET_CACHE_TTL, default: 300)"""
+    return env_float('SECRET_CACHE_TTL', 300.0)
+
+
+def _get_cached(secret_id: str):
+    with _cache_lock:
+        entry = _secret_cache.get(secret_id)
+    if entry and time.time() - entry[0] < _cache_ttl():
+        return entry[1]
+    return None
+
+
+def _put_cached(secret_id: str, data):
+    with _cache_lock:
+        _secret_cache[secret_id] = (time.time(), data)
+
+
+def _translate_client_error(e: ClientError, secret_id: str):
+    """Map Secrets Manager errors to the exceptions callers expect"""
+    error_code = e.response['Error']['Code']
+    if error_code == 'ResourceNotFoundException':
+        raise ValueError(f"Secret not found: {secret_id}")
+    elif error_code == 'AccessDeniedException':
+        raise PermissionError(f"Access denied to secret: {secret_id}")
+    raise e
+
+
+def get_secret_json(secret_id: str):
+    """
+    Retrieve and parse a JSON secret, reusing the cached payload when fresh
+
+    Raises:
+        ValueError: If the secret does not exist
+        PermissionError: If access to the secret is denied
+    """
+    data = _get_cached(secret_id)
+    if data is not None:
+        return data
+
+    try:
+        response = get_secrets_client().get_secret_value(SecretId=secret_id)
+    except ClientError as e:
+        _translate_client_error(e, secret_id)
+
+    data = json.loads(response['SecretString'])
+    _put_cached(secret_id, data)
+    return data
+
+
+def batch_get_secret_json(secret_ids: list) -> dict:
+    """
+    Retrieve and parse several JSON secrets, BATCH_SIZE per API call
+
+    Falls back to one GetSecretValue call per secret when the client does
+    not support BatchGetSecretValue (older boto3).
+
+    Returns:
+        dict of secret ID -> parsed payload
+
+    Raises:
+        ValueError: If a secret does not exist
+        PermissionError: If access to a secret is denied
+    """
+    results = {}
+    missing = []
+    for secret_id in secret_ids:
+        data = _get_cached(secret_id)
+        if data is None:
+            missing.append(secret_id)
+        else:
+            results[secret_id] = data
+
+    client = get_secrets_client()
+    if missing and not hasattr(client, 'batch_get_secret_value'):
+        for secret_id in missing:
+            results[secret_id] = get_secret_json(secret_id)
+        return results
+
+    for i in range(0, len(missing), BATCH_SIZE):
+        batch = missing[i:i + BATCH_SIZE]
+        try:
+            response = client.batch_get_secret_value(SecretIdList=batch)
+        except ClientError as e:
+            _translate_client_error(e, ', '.join(batch))
+
+        for error in response.get('Errors', []):
+            secret_id = error.get('SecretId')
+            if error.get('ErrorCode') == 'ResourceNotFoundException':
+                raise ValueError(f"Secret not found: {secret_id}")
+            elif error.get('ErrorCode') == 'AccessDeniedException':
+                raise PermissionError(f"Access denied to secret: {secret_id}")
+            raise ValueError(f"Failed to retrieve secret {secret_id}: {error.get('Message')}")
+
+        # Entries carry both Name and ARN; map back to the requested ID
+        for entry in response.get('SecretValues', []):
+            data = json.loads(entry['SecretString'])
+            secret_id = next((s for s in batch if s in (entry.get('Name'), entry.get('ARN'))), entry.get('Name'))
+            _put_cached(secret_id, data)
+            results[secret_id] = data
+
+    return results
+
+
+def _validate_account(account, label: str):
+    """Validate a single account entry"""
+    if not isinstance(account, dict):
+        raise ValueError(f"{label} must be a JSON object")
+    if 'username' not in account or 'password' not in account:
+        raise ValueError(f"{label} missing 'username' or 'password'")
+
+
+class CredentialProvider(ABC):
+    """
+    Source of account credentials
+
+    Accounts are addressed by an opaque account ID so that a worker can
+    pick its shard from list_account_ids() and resolve only those.
+    """
+
+    @abstractmethod
+    def list_account_ids(self) -> list:
+        """Return the IDs of all configured accounts"""
+
+    @abstractmethod
+    def iter_credentials(self, account_ids: list):
+        """Yield credential dicts ('username', 'password') for the given IDs"""
+
+    def get_credentials(self, account_ids: list) -> list:
+        """Resolve credentials for the given IDs"""
+        return list(self.iter_credentials(account_ids))
+
+
+class SingleSecretProvider(CredentialProvider):
+    """
+    All accounts stored in one secret's 'accounts' array
+
+    Secret format:
+        {"accounts": [{"username": "id1", "password": "pw1"}, ...]}
+
+    Account IDs are positions in the array.
+    """
+
+    def __init__(self, secret_name: str, secret_data: dict):
+        self.secret_name = secret_name
+
+        if 'accounts' not in secret_data:
+            raise ValueError(f"Secret {secret_name} must have 'accounts' key")
+
+        accounts = secret_data['accounts']
+        if not isinstance(accounts, list):
+            raise ValueError(f"'accounts' must be a JSON array")
+
+        for i, account in enumerate(accounts):
+            _validate_account(account, f"Account {i+1}")
+
+        self.accounts = accounts
+
+    def list_account_ids(self) -> list:
+        return list(range(len(self.accounts)))
+
+    def iter_credentials(self, account_ids: list):
+        for account_id in account_ids:
+            yield self.accounts[account_id]
+
+
+class PerAccountSecretProvider(CredentialProvider):
+    """
+    One secret per account, listed in an index secret
+
+    Index secret format:
+        {"accountSecrets": ["lotto-automation/accounts/id1", ...]}
+
+    Account secret format:
+        {"username": "id1", "password": "pw1"}
+
+    Account IDs are the account secret IDs. Secrets are fetched lazily,
+    BATCH_SIZE per BatchGetSecretValue call.
+    """
+
+    def __init__(self, secret_name: str, secret_data: dict):
+        self.secret_name = secret_name
+
+        account_secrets = secret_data['accountSecrets']
+        if not isinstance(account_secrets, list) or not all(isinstance(s, str) for s in account_secrets):
+            raise ValueError(f"'accountSecrets' must be a JSON array of secret IDs")
+
+        self.account_secrets = account_secrets
+
+    def list_account_ids(self) -> list:
+        return list(self.account_secrets)
+
+    def iter_credentials(self, account_ids: list):
+        for i in range(0, len(account_ids), BATCH_SIZE):
+            batch = account_ids[i:i + BATCH_SIZE]
+            secrets = batch_get_secret_json(batch)
+            for secret_id in batch:
+                account = secrets[secret_id]
+                _validate_account(account, f"Account secret {secret_id}")
+                yield account
+
+
+def get_credential_provider(secret_name: str) -> CredentialProvider:
+    """
+    Create the credential provider matching the layout of the main secret
+
+    Args:
+        secret_name: Name of the secret (e.g., 'lotto-automation/credentials')
+
+    Returns:
+        PerAccountSecretProvider if the secret has 'accountSecrets',
+        otherwise SingleSecretProvider
+
+    Raises:
+        ValueError: If secret format is invalid or the secret does not exist
+        PermissionError: If access to the secret is denied
+    """
+    secret_data = get_secret_json(secret_name)
+
+    if not isinstance(secret_data, dict):
+        raise ValueError(f"Secret {secret_name} must be a JSON object")
+
+    if 'accountSecrets' in secret_data:
+        return PerAccountSecretProvider(secret_name, secret_data)
+    return SingleSecretProvider(secret_name, secret_data)
+
+
+def select_shard(account_ids: list, shard_index: int = 0, shard_count: int = 1) -> list:
+    """Return the account IDs handled by one shard (round-robin split)"""
+    if shard_count <= 1:
+        return list(account_ids)
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"Invalid shard {shard_index} of {shard_count}")
+    return list(account_ids)[shard_index::shard_count]
+
+
 def get_all_credentials(secret_name: str) -> list:
     """
     Retrieve all account credentials from Secrets Manager
@@ -35,46 +295,14 @@ def get_all_credentials(secret_name: str) -> list:
             {"username": "id2", "password": "pw2"}
           ]
         }
+        or an index of per-account secrets (see PerAccountSecretProvider)
 
     Raises:
         ClientError: If secret retrieval fails
         ValueError: If secret format is invalid
     """
-    client = get_secrets_client()
-
-    try:
-        response = client.get_secret_value(SecretId=secret_name)
-        secret_string = response['SecretString']
-        secret_data = json.loads(secret_string)
-
-        # Validate format
-        if not isinstance(secret_data, dict):
-            raise ValueError(f"Secret {secret_name} must be a JSON object")
-
-        if 'accounts' not in secret_data:
-            raise ValueError(f"Secret {secret_name} must have 'accounts' key")
-
-        accounts = secret_data['accounts']
-
-        if not isinstance(accounts, list):
-            raise ValueError(f"'accounts' must be a JSON array")
-
-        # Validate each account
-        for i, account in enumerate(accounts):
-            if not isinstance(account, dict):
-                raise ValueError(f"Account {i+1} must be a JSON object")
-            if 'username' not in account or 'password' not in account:
-                raise ValueError(f"Account {i+1} missing 'username' or 'password'")
-
-        return accounts
-
-    except ClientError as e:
-        error_code = e.response['Error']['Code']
-        if error_code == 'ResourceNotFoundException':
-            raise ValueError(f"Secret not found: {secret_name}")
-        elif error_code == 'AccessDeniedException':
-            raise PermissionError(f"Access denied to secret: {secret_name}")
-        raise
+    provider = get_credential_provider(secret_name)
+    return provider.get_credentials(provider.list_account_ids())
 
 
 def get_low_balance_threshold(secret_name: str, default: int = 30000) -> int:
@@ -94,15 +322,38 @@ def get_low_balance_threshold(secret_name: str, default: int = 30000) -> int:
           "lowBalanceThreshold": 30000
         }
     """
-    client = get_secrets_client()
-
     try:
-        response = client.get_secret_value(SecretId=secret_name)
-        secret_string = response['SecretString']
-        secret_data = json.loads(secret_string)
+        secret_data = get_secret_json(secret_name)
 
         threshold = secret_data.get('lowBalanceThreshold', default)
         return int(threshold)
 
-    except (ClientError, json.JSONDecodeError, ValueError):
+    except (ClientError, json.JSONDecodeError, ValueError, PermissionError):
+        return default
+
+
+def get_weekly_budget(secret_name: str, default: int = 10000) -> int:
+    """
+    Retrieve the weekly spending budget per account from Secrets Manager
+
+    Args:
+        secret_name: Name of the secret (e.g., 'lotto-automation/credentials')
+        default: Default budget if not set in secret (default: 10000, 5 lotto + 5 pension rounds)
+
+    Returns:
+        int: Weekly budget in KRW
+
+    Secret format:
+        {
+          "accounts": [...],
+          "weeklyBudget": 10000
+        }
+    """
+    try:
+        secret_data = get_secret_json(secret_name)
+
+        budget = secret_data.get('weeklyBudget', default)
+        return int(budget)
+
+    except (ClientError, json.JSONDecodeError, ValueError, PermissionError):
         return default
@@ -0,0 +1,199 @@
+"""
+Selector Registry
+Known page layouts of dhlottery.co.kr with ID-first selectors and ordered fallbacks
+"""
+import time
+import logging
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+from flows import FlowAbort
+
+logger = logging.getLogger(__name__)
+
+# Seconds a page may take to show a known layout before the probe gives up
+PROBE_TIMEOUT = 5
+PROBE_INTERVAL = 0.25
+
+# Per page, known layouts newest first. A layout matches when every probe
+# (CSS) is present. Selectors are tried in order: IDs first, then CSS
+# anchored on the nearest ID, then the legacy positional XPath.
+LAYOUTS = {
+    'login': [{
+        'version': '2024',
+        'probe': ['#inpUserId', '#inpUserPswdEncn', '#btnLogin'],
+        'selectors': {
+            'user_id': [(By.ID, 'inpUserId')],
+            'password': [(By.ID, 'inpUserPswdEncn')],
+            'login_button': [(By.ID, 'btnLogin')],
+        },
+    }],
+    'mypage': [{
+        'version': '2024',
+        'probe': ['#divCrntEntrsAmt'],
+        'selectors': {
+            'balance': [(By.ID, 'divCrntEntrsAmt')],
+        },
+    }],
+    'ledger': [{
+        'version': '2024',
+        # The result list may render only after the search (or not at all for an empty ledger)
+        'probe': ['#btnSrch'],
+        'selectors': {
+            'search_button': [(By.ID, 'btnSrch')],
+            'history_list': [(By.ID, 'winning-history-list')],
+            'result_rows': [
+                (By.CSS_SELECTOR, '#winning-history-list > ul:nth-of-type(2) > li'),
+                (By.XPATH, '//*[@id="winning-history-list"]/ul[2]/li'),
+            ],
+            'result_cells': [
+                (By.CSS_SELECTOR, '#winning-history-list > ul:nth-of-type(2) > li > div:nth-of-type(6) > span:nth-of-type(2)'),
+                (By.XPATH, '//*[@id="winning-history-list"]/ul[2]/li/div[6]/span[2]'),
+            ],
+        },
+    }],
+    'game645': [{
+        'version': '2024',
+        'probe': ['#tabWay2Buy', '#amoundApply', '#btnSelectNum', '#btnBuy', '#popupLayerConfirm'],
+        'selectors': {
+            'auto_tab': [
+                (By.CSS_SELECTOR, '#tabWay2Buy > li:nth-of-type(2)'),
+                (By.XPATH, '//*[@id="tabWay2Buy"]/li[2]'),
+            ],
+            'ticket_count': [(By.ID, 'amoundApply')],
+            'select_numbers': [(By.ID, 'btnSelectNum')],
+            'buy_button': [(By.ID, 'btnBuy')],
+            'confirm_button': [
+                (By.CSS_SELECTOR, '#popupLayerConfirm input[type="button"][value="확인"]'),
+                (By.XPATH, '//*[@id="popupLayerConfirm"]/div/div[2]/input[1]'),
+            ],
+        },
+    }],
+    'pension': [{
+        'version': '2024',
+        'probe': ['#ifrm_tab'],
+        'selectors': {
+            'game_frame': [(By.ID, 'ifrm_tab')],
+        },
+    }],
+    'pension_frame': [{
+        'version': '2024',
+        'probe': ['#frm', '#tab2', '#repeatRound', '#resevationConfirm'],
+        'selectors': {
+            'reservation_tab': [
+                (By.CSS_SELECTOR, '#frm > div > ul:nth-of-type(1) > li:nth-of-type(3) > a'),
+                (By.XPATH, '//*[@id="frm"]/div/ul[1]/li[3]/a'),
+            ],
+            'ticket_count': [(By.ID, 'repeatRound')],
+            'buy_button': [
+                (By.CSS_SELECTOR, '#tab2 > ul > li:nth-of-type(5) > a'),
+                (By.XPATH, '//*[@id="tab2"]/ul/li[5]/a'),
+            ],
+            'confirm_button': [
+                (By.CSS_SELECTOR, '#resevationConfirm > div > div:nth-of-type(3) > a:nth-of-type(1)'),
+                (By.XPATH, '//*[@id="resevationConfirm"]/div/div[3]/a[1]'),
+            ],
+            'period_all': [
+                (By.CSS_SELECTOR, '#tab2 > div:nth-of-type(1) > div:nth-of-type(1) > div:nth-of-type(2) > a:nth-of-type(5)'),
+                (By.XPATH, '//*[@id="tab2"]/div[1]/div[1]/div[2]/a[5]'),
+            ],
+            'search_button': [
+                (By.CSS_SELECTOR, '#tab2 > div:nth-of-type(1) > div:nth-of-type(1) > div:nth-of-type(1) > a'),
+                (By.XPATH, '//*[@id="tab2"]/div[1]/div[1]/div[1]/a'),
+            ],
+            'reservation_status': [
+                (By.CSS_SELECTOR, '#tab2 > div:nth-of-type(1) > div:nth-of-type(2) > ul > li:nth-of-type(1) > span:nth-of-type(1)'),
+                (By.XPATH, '//*[@id="tab2"]/div[1]/div[2]/ul/li[1]/span[1]'),
+            ],
+        },
+    }],
+}
+
+PROBE_SCRIPT = '''
+return arguments[0].map(function (probe) {
+    return probe.every(function (css) { return document.querySelector(css) !== null; });
+});
+'''
+
+
+class UnknownLayoutError(FlowAbort):
+    """Raised when a page matches none of its known layouts (site redesign)"""
+
+    def __init__(self, page: str, url: str):
+        versions = ', '.join(layout['version'] for layout in LAYOUTS[page])
+        super().__init__(f"Unknown layout of page '{page}' at {url} (known: {versions}); selectors need an update")
+        self.page = page
+
+
+class SelectorNotFoundError(Exception):
+    """Raised when no selector of an element matched"""
+
+
+def probe_page(driver, page: str, timeout: float = PROBE_TIMEOUT) -> dict:
+    """
+    Detect the layout version of the current page with one script per poll
+
+    Returns:
+        the matching layout dict
+
+    Raises:
+        UnknownLayoutError: If no known layout appears within timeout
+    """
+    layouts = LAYOUTS[page]
+    probes = [layout['probe'] for layout in layouts]
+    deadline = time.time() + timeout
+
+    while True:
+        matches = driver.execute_script(PROBE_SCRIPT, probes) or []
+        for layout, matched in zip(layouts, matches):
+            if matched:
+                if not hasattr(driver, 'page_layouts'):
+                    driver.page_layouts = {}
+                driver.page_layouts[page] = layout
+                logger.info(f"Page '{page}' layout {layout['version']}")
+                return layout
+        if time.time() >= deadline:
+            raise UnknownLayoutError(page, driver.current_url)
+        time.sleep(PROBE_INTERVAL)
+
+
+def _candidates(driver, page: str, name: str) -> list:
+    """Selectors of an element for the probed (or newest) layout of a page"""
+    layout = getattr(driver, 'page_layouts', {}).get(page) or LAYOUTS[page][0]
+    return layout['selectors'][name]
+
+
+def _locate(driver, page: str, name: str, candidates: list):
+    for index, (by, value) in enumerate(candidates):
+        elements = driver.find_elements(by, value)
+        if elements:
+            if index:
+                logger.warning(f"Selector {page}.{name} matched fallback #{index}: {value}")
+            return elements
+    return None
+
+
+def find(driver, page: str, name: str, timeout: float = 10):
+    """
+    Wait for an element, polling all of its selectors together
+
+    Raises:
+        SelectorNotFoundError: If no selector matches within timeout
+    """
+    candidates = _candidates(driver, page, name)
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=PROBE_INTERVAL).until(
+            lambda d: _locate(d, page, name, candidates) or False
+        )[0]
+    except TimeoutException:
+        raise SelectorNotFoundError(f"{page}.{name} not found after {timeout}s")
+
+
+def find_all(driver, page: str, name: str) -> list:
+    """All elements matched by the first matching selector (no waiting)"""
+    return _locate(driver, page, name, _candidates(driver, page, name)) or []
+
+
+def is_present(driver, page: str, name: str) -> bool:
+    """Check if an element is on the page (no waiting)"""
+    return bool(find_all(driver, page, name))
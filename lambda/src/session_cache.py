@@ -0,0 +1,81 @@
+"""
+Login Session Cache
+Per-account browser cookies reused by later logins in the same container
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from config import env_int
+
+logger = logging.getLogger(__name__)
+
+SESSION_DIR = '/tmp/lotto-sessions'
+
+# Default lifetime of a cached session (seconds); the site expires idle sessions
+DEFAULT_SESSION_TTL = 1200
+
+_session_lock = threading.Lock()
+
+
+def get_session_ttl() -> int:
+    """Lifetime of cached sessions (SESSION_CACHE_TTL, default: 1200, 0 disables the cache)"""
+    return env_int('SESSION_CACHE_TTL', DEFAULT_SESSION_TTL, minimum=0)
+
+
+def _path(username: str) -> str:
+    """Cache file of an account (usernames are not written in clear)"""
+    return os.path.join(SESSION_DIR, hashlib.sha1(username.encode('utf-8')).hexdigest()[:20] + '.json')
+
+
+def save_session(username: str, cookies: list):
+    """
+    Cache the cookies of a logged-in browser session
+
+    Args:
+        cookies: list of cookies in DevTools format (Network.getAllCookies)
+    """
+    if not get_session_ttl() or not cookies:
+        return
+    with _session_lock:
+        try:
+            os.makedirs(SESSION_DIR, mode=0o700, exist_ok=True)
+            path = _path(username)
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'saved_at': time.time(), 'cookies': cookies}, f)
+        except OSError as e:
+            logger.warning(f"{username}: Failed to cache login session: {e}")
+
+
+def load_session(username: str):
+    """
+    Get the cached cookies of an account
+
+    Returns:
+        list of cookies, or None if there is no fresh session
+    """
+    ttl = get_session_ttl()
+    if not ttl:
+        return None
+    with _session_lock:
+        try:
+            with open(_path(username)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+    if time.time() - data.get('saved_at', 0) > ttl:
+        clear_session(username)
+        return None
+    return data.get('cookies')
+
+
+def clear_session(username: str):
+    """Drop the cached session of an account (e.g., after it was rejected)"""
+    with _session_lock:
+        try:
+            os.remove(_path(username))
+        except OSError:
+            pass
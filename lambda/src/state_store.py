@@ -0,0 +1,67 @@
+"""
+State Store
+Shared S3 client and small JSON state documents kept in S3 (when a bucket is set) or /tmp
+"""
+import os
+import json
+import logging
+import threading
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+# Singleton S3 client shared by all account threads
+_s3_client = None
+_s3_lock = threading.Lock()
+
+
+def get_s3_client():
+    """Get or create S3 client (created once under a lock; boto3's default session is not thread-safe)"""
+    global _s3_client
+    with _s3_lock:
+        if _s3_client is None:
+            _s3_client = boto3.client('s3')
+        return _s3_client
+
+
+def load_json(bucket: str, key: str, path: str, default, label: str):
+    """
+    Load a JSON document from s3://bucket/key, or from path when no bucket is set
+
+    Args:
+        bucket: S3 bucket (None or empty to use the local file)
+        key: S3 object key
+        path: Local file path
+        default: Returned when the document does not exist or cannot be read
+        label: Description used in log messages
+    """
+    try:
+        if bucket:
+            response = get_s3_client().get_object(Bucket=bucket, Key=key)
+            return json.loads(response['Body'].read())
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+            logger.warning(f"Failed to load {label}: {e}")
+    except Exception as e:
+        logger.warning(f"Failed to load {label}: {e}")
+    return default
+
+
+def save_json(bucket: str, key: str, path: str, data, label: str) -> bool:
+    """Save a JSON document to s3://bucket/key, or to path when no bucket is set"""
+    body = json.dumps(data, separators=(',', ':'))
+    try:
+        if bucket:
+            get_s3_client().put_object(Bucket=bucket, Key=key, Body=body.encode('utf-8'))
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(body)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to save {label}: {e}")
+        return False
@@ -0,0 +1,207 @@
+"""
+Site Throttling Utility
+Global rate limiting, waiting-queue handling and jittered backoff for dhlottery.co.kr
+"""
+import re
+import time
+import random
+import logging
+import threading
+from selenium.webdriver.common.by import By
+from config import env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+# Waiting-queue (NetFunnel) elements shown by the site at peak times
+QUEUE_ELEMENT_IDS = ['NetFunnel_Loading_Popup', 'NetFunnel_Skin_Top']
+
+# HTTP status of the loaded document that means throttling / overload
+THROTTLE_STATUS_CODES = (429, 503)
+
+# Navigation Timing Level 2 responseStatus (Chrome 109+), 0 if unknown
+RESPONSE_STATUS_SCRIPT = """
+const entry = performance.getEntriesByType('navigation')[0];
+return entry && entry.responseStatus ? entry.responseStatus : 0;
+"""
+
+QUEUE_POSITION_PATTERN = re.compile(r'(?:대기\s*(?:순번|인원)|순번)\D{0,10}([\d,]+)')
+
+MAX_THROTTLE_RETRIES = 4
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 30.0
+
+# Queue polling bounds (seconds)
+QUEUE_POLL_MIN_SECONDS = 1.0
+QUEUE_POLL_MAX_SECONDS = 15.0
+# Rough number of queue positions admitted per second, used to pace polling
+QUEUE_ADMIT_PER_SECOND = 50
+
+
+class SiteThrottledError(Exception):
+    """Raised when the site keeps throttling after all retries"""
+
+
+class QueueTimeoutError(Exception):
+    """Raised when the waiting queue does not clear in time"""
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by all account sessions
+
+    Args:
+        rate: Tokens added per second
+        burst: Maximum number of tokens that can accumulate
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold back every session for a while (e.g., after a throttling response)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+# Singleton limiter shared by all concurrent account sessions
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or create the global site rate limiter (SITE_RATE_LIMIT req/s, SITE_RATE_BURST)"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            rate = env_float('SITE_RATE_LIMIT', 2.0, minimum=0.1)
+            burst = env_int('SITE_RATE_BURST', 4, minimum=1)
+            _limiter = RateLimiter(rate, burst)
+        return _limiter
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE_SECONDS, cap: float = BACKOFF_MAX_SECONDS) -> float:
+    """Exponential backoff with full jitter for the given attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _page_text(driver) -> str:
+    """Title and visible text of the current page"""
+    try:
+        body = driver.execute_script("return document.body ? document.body.innerText.slice(0, 5000) : '';")
+    except Exception:
+        body = ''
+    return f"{driver.title}\n{body or ''}"
+
+
+def is_queue_page(driver) -> bool:
+    """Check if the site is showing a waiting-queue (NetFunnel) page, by its element IDs only"""
+    for element_id in QUEUE_ELEMENT_IDS:
+        if any(element.is_displayed() for element in driver.find_elements(By.ID, element_id)):
+            return True
+    return False
+
+
+def get_response_status(driver) -> int:
+    """HTTP status of the current document, 0 if unknown"""
+    try:
+        return int(driver.execute_script(RESPONSE_STATUS_SCRIPT) or 0)
+    except Exception:
+        return 0
+
+
+def get_queue_position(driver):
+    """Parse the waiting-queue position, None if not shown"""
+    match = QUEUE_POSITION_PATTERN.search(_page_text(driver))
+    if not match:
+        return None
+    return int(match.group(1).replace(',', ''))
+
+
+def wait_for_queue(driver, username: str, max_wait: float = None):
+    """
+    Wait until the waiting-queue page clears
+
+    Polling interval scales with the reported queue position so that long
+    queues are not hammered, with jitter to de-synchronize sessions.
+
+    Raises:
+        QueueTimeoutError: If the queue does not clear within max_wait seconds
+    """
+    if max_wait is None:
+        max_wait = env_float('QUEUE_MAX_WAIT', 180.0)
+
+    started = time.monotonic()
+    while is_queue_page(driver):
+        elapsed = time.monotonic() - started
+        if elapsed > max_wait:
+            raise QueueTimeoutError(f"Waiting queue did not clear within {max_wait:.0f}s")
+
+        position = get_queue_position(driver)
+        if position is None:
+            interval = QUEUE_POLL_MIN_SECONDS * 2
+        else:
+            interval = position / QUEUE_ADMIT_PER_SECOND / 2
+        interval = min(QUEUE_POLL_MAX_SECONDS, max(QUEUE_POLL_MIN_SECONDS, interval))
+        interval *= random.uniform(0.8, 1.2)
+
+        logger.info(f"{username}: In waiting queue (position: {position}, waited: {elapsed:.0f}s), next poll in {interval:.1f}s")
+        time.sleep(interval)
+
+    waited = time.monotonic() - started
+    if waited > 0.5:
+        logger.info(f"{username}: Waiting queue cleared after {waited:.0f}s")
+
+
+def load_with_backoff(driver, url: str, username: str):
+    """
+    Load url through the global rate limiter, waiting out queues and backing off on throttling
+
+    Raises:
+        SiteThrottledError: If the page is still throttled after MAX_THROTTLE_RETRIES
+        QueueTimeoutError: If a waiting queue does not clear in time
+    """
+    limiter = get_rate_limiter()
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        limiter.acquire()
+        driver.get(url)
+
+        if is_queue_page(driver):
+            wait_for_queue(driver, username)
+
+        status = get_response_status(driver)
+        if status not in THROTTLE_STATUS_CODES:
+            return
+
+        if attempt == MAX_THROTTLE_RETRIES:
+            break
+
+        delay = backoff_delay(attempt)
+        logger.warning(f"{username}: Site throttled on {url} (HTTP {status}), retrying in {delay:.1f}s (attempt {attempt + 1}/{MAX_THROTTLE_RETRIES})")
+        # Slow down every session, not just this one
+        limiter.pause(delay)
+        time.sleep(delay)
+
+    raise SiteThrottledError(f"Site still throttled after {MAX_THROTTLE_RETRIES} retries: {url}")
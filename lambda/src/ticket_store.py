@@ -0,0 +1,154 @@
+"""
+Ticket Store
+Compact per-account store of purchased lotto 6/45 and pension 720+ tickets
+"""
+import os
+import hashlib
+import logging
+import threading
+from state_store import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = '/tmp/lotto-tickets'
+STORE_S3_PREFIX = 'tickets/'
+
+# Tickets older than this many rounds behind the newest one are dropped
+KEEP_ROUNDS = 12
+
+_store_lock = threading.Lock()
+
+
+def _key(username: str) -> str:
+    """Storage key of an account (usernames are not written in clear)"""
+    return hashlib.sha1(username.encode('utf-8')).hexdigest()[:20] + '.json'
+
+
+def _load(username: str) -> dict:
+    """
+    Load an account's tickets
+
+    Format (compact arrays):
+        {"lotto": [[round, slot, "010203040506"], ...],
+         "pension": [[round, group, "123456"], ...],
+         "reserved": [round, ...]}
+
+    'reserved' lists pension rounds known to be reserved even when the
+    receipt numbers could not be captured.
+    """
+    return load_json(
+        os.environ.get('TICKET_STORE_BUCKET'),
+        STORE_S3_PREFIX + _key(username),
+        os.path.join(STORE_DIR, _key(username)),
+        {'lotto': [], 'pension': [], 'reserved': []},
+        f"ticket store of {username}",
+    )
+
+
+def _save(username: str, data: dict):
+    save_json(
+        os.environ.get('TICKET_STORE_BUCKET'),
+        STORE_S3_PREFIX + _key(username),
+        os.path.join(STORE_DIR, _key(username)),
+        data,
+        f"ticket store of {username}",
+    )
+
+
+def _prune(rows: list) -> list:
+    if not rows:
+        return rows
+    newest = max(row[0] for row in rows)
+    return [row for row in rows if row[0] > newest - KEEP_ROUNDS]
+
+
+def add_lotto_tickets(username: str, tickets: list):
+    """
+    Store lotto 6/45 tickets
+
+    Args:
+        tickets: list of dicts with 'round', 'slot' and 'numbers' (6 ints)
+    """
+    if not tickets:
+        return
+    with _store_lock:
+        data = _load(username)
+        rows = {(row[0], row[1]): row for row in data.get('lotto', [])}
+        for ticket in tickets:
+            encoded = ''.join(f"{n:02d}" for n in ticket['numbers'])
+            rows[(ticket['round'], ticket['slot'])] = [ticket['round'], ticket['slot'], encoded]
+        data['lotto'] = _prune(sorted(rows.values()))
+        _save(username, data)
+    logger.info(f"{username}: Stored {len(tickets)} lotto tickets")
+
+
+def add_pension_tickets(username: str, tickets: list):
+    """
+    Store pension 720+ tickets
+
+    Args:
+        tickets: list of dicts with 'round', 'group' (1-5) and 'number' (6 digit str)
+    """
+    if not tickets:
+        return
+    with _store_lock:
+        data = _load(username)
+        rows = {(row[0], row[1], row[2]): row for row in data.get('pension', [])}
+        for ticket in tickets:
+            rows[(ticket['round'], ticket['group'], ticket['number'])] = [ticket['round'], ticket['group'], ticket['number']]
+        data['pension'] = _prune(sorted(rows.values()))
+        _save(username, data)
+    logger.info(f"{username}: Stored {len(tickets)} pension tickets")
+
+
+def add_pension_reservation(username: str, first_round: int, rounds: int):
+    """
+    Record pension rounds first_round..first_round + rounds - 1 as reserved
+
+    Coverage is kept even when the reservation receipt could not be parsed
+    or the reservation was made outside this automation.
+    """
+    if rounds < 1:
+        return
+    with _store_lock:
+        data = _load(username)
+        reserved = set(data.get('reserved', [])) | set(range(first_round, first_round + rounds))
+        newest = max(reserved)
+        data['reserved'] = sorted(r for r in reserved if r > newest - KEEP_ROUNDS)
+        _save(username, data)
+    logger.info(f"{username}: Recorded pension rounds {first_round}-{first_round + rounds - 1} as reserved")
+
+
+def get_lotto_tickets(username: str, min_round: int = None, max_round: int = None) -> list:
+    """
+    Get stored lotto 6/45 tickets
+
+    Args:
+        min_round: Only return tickets of rounds from this one on
+        max_round: Only return tickets of rounds up to this one (e.g., already drawn)
+
+    Returns:
+        list of dicts with 'round', 'slot' and 'numbers'
+    """
+    rows = _load(username).get('lotto', [])
+    return [
+        {'round': row[0], 'slot': row[1], 'numbers': [int(row[2][i:i + 2]) for i in range(0, 12, 2)]}
+        for row in rows
+        if (min_round is None or row[0] >= min_round) and (max_round is None or row[0] <= max_round)
+    ]
+
+
+def get_pension_rounds(username: str, min_round: int = None, max_round: int = None) -> set:
+    """
+    Pension 720+ rounds with a stored ticket or a recorded reservation
+
+    Args:
+        min_round: Only return rounds from this one on
+        max_round: Only return rounds up to this one (e.g., already drawn)
+    """
+    data = _load(username)
+    rounds = {row[0] for row in data.get('pension', [])} | set(data.get('reserved', []))
+    return {
+        r for r in rounds
+        if (min_round is None or r >= min_round) and (max_round is None or r <= max_round)
+    }
@@ -0,0 +1,312 @@
+"""
+Chrome Tracing Utility
+Records CDP Network/Performance metrics per navigation (opt-in via CHROME_TRACE)
+"""
+import os
+import json
+import gzip
+import time
+import logging
+import threading
+from config import env_flag
+from state_store import get_s3_client
+
+logger = logging.getLogger(__name__)
+
+TRACE_DIR = '/tmp/lotto-traces'
+SLOWEST_RESOURCE_COUNT = 5
+
+# Subset of CDP Performance.getMetrics kept in the summary
+PERFORMANCE_METRICS = [
+    'Nodes',
+    'JSHeapUsedSize',
+    'LayoutDuration',
+    'ScriptDuration',
+    'TaskDuration',
+]
+
+# Navigation records collected during the current invocation (all sessions)
+_navigations = []
+_navigations_lock = threading.Lock()
+
+
+def is_tracing_enabled() -> bool:
+    """Check if CDP tracing is enabled for this container"""
+    return env_flag('CHROME_TRACE')
+
+
+def is_har_enabled() -> bool:
+    """Check if a compressed HAR should be written alongside the summary"""
+    return env_flag('CHROME_TRACE_HAR')
+
+
+def enable_tracing(options):
+    """Enable ChromeDriver performance logging on Chrome options"""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    options.add_experimental_option('perfLoggingPrefs', {
+        'enableNetwork': True,
+        'enablePage': True,
+    })
+
+
+def start_tracing(driver):
+    """Enable the CDP Performance domain on a freshly created driver"""
+    try:
+        driver.execute_cdp_cmd('Performance.enable', {})
+    except Exception as e:
+        logger.warning(f"Failed to enable CDP Performance domain: {e}")
+
+
+def _read_network_events(driver) -> dict:
+    """Drain the performance log and group Network events by requestId"""
+    requests = {}
+    try:
+        entries = driver.get_log('performance')
+    except Exception as e:
+        logger.warning(f"Failed to read performance log: {e}")
+        return requests
+
+    for entry in entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+
+        method = message.get('method', '')
+        params = message.get('params', {})
+        request_id = params.get('requestId')
+        if not method.startswith('Network.') or not request_id:
+            continue
+
+        request = requests.setdefault(request_id, {'url': None, 'status': None, 'bytes': 0})
+        if method == 'Network.requestWillBeSent':
+            request['url'] = params['request']['url']
+            request['method'] = params['request'].get('method', 'GET')
+            request['start'] = params['timestamp']
+            request['wall_time'] = params.get('wallTime')
+        elif method == 'Network.responseReceived':
+            request['status'] = params['response'].get('status')
+            request['mime_type'] = params['response'].get('mimeType')
+        elif method == 'Network.loadingFinished':
+            request['end'] = params['timestamp']
+            request['bytes'] = int(params.get('encodedDataLength', 0))
+        elif method == 'Network.loadingFailed':
+            request['end'] = params['timestamp']
+            request['failed'] = params.get('errorText', 'failed')
+
+    return requests
+
+
+def _to_resources(requests: dict) -> list:
+    """Convert grouped Network events into resource records"""
+    resources = []
+    for request in requests.values():
+        if not request.get('url') or request['url'].startswith('data:'):
+            continue
+        duration_ms = None
+        if request.get('start') is not None and request.get('end') is not None:
+            duration_ms = round((request['end'] - request['start']) * 1000, 1)
+        resources.append({
+            'url': request['url'],
+            'method': request.get('method', 'GET'),
+            'status': request.get('status'),
+            'mime_type': request.get('mime_type'),
+            'bytes': request['bytes'],
+            'duration_ms': duration_ms,
+            'wall_time': request.get('wall_time'),
+            'failed': request.get('failed'),
+        })
+    return resources
+
+
+def _read_navigation_timing(driver) -> dict:
+    """Read Navigation Timing Level 2 entry of the current document"""
+    try:
+        timing = driver.execute_script(
+            "const n = performance.getEntriesByType('navigation')[0];"
+            "return n ? n.toJSON() : null;"
+        )
+    except Exception as e:
+        logger.warning(f"Failed to read navigation timing: {e}")
+        return {}
+
+    if not timing:
+        return {}
+    return {
+        'ttfb_ms': round(timing.get('responseStart', 0), 1),
+        'dom_content_loaded_ms': round(timing.get('domContentLoadedEventEnd', 0), 1),
+        'load_ms': round(timing.get('loadEventEnd', 0), 1),
+    }
+
+
+def _read_performance_metrics(driver) -> dict:
+    """Read selected CDP Performance.getMetrics values"""
+    try:
+        response = driver.execute_cdp_cmd('Performance.getMetrics', {})
+    except Exception as e:
+        logger.warning(f"Failed to read CDP performance metrics: {e}")
+        return {}
+    return {
+        metric['name']: metric['value']
+        for metric in response.get('metrics', [])
+        if metric['name'] in PERFORMANCE_METRICS
+    }
+
+
+def _drain(driver):
+    """Attribute pending Network events of a driver to its own last navigation"""
+    requests = _read_network_events(driver)
+    navigation = getattr(driver, 'trace_navigation', None)
+    if requests and navigation is not None:
+        with _navigations_lock:
+            navigation['resources'].extend(_to_resources(requests))
+
+
+def begin_navigation(driver):
+    """
+    Attribute pending Network events to the previous navigation of this driver
+
+    Late XHRs fired after the previous page load would otherwise be
+    counted against the next navigation. Records are kept per driver so
+    concurrent account sessions never mix their events.
+    """
+    if not is_tracing_enabled():
+        return
+    _drain(driver)
+
+
+def end_navigation(driver, url: str, username: str = None, started_at: float = None):
+    """Record metrics for the navigation that just completed"""
+    if not is_tracing_enabled():
+        return
+    navigation = {
+        'username': username,
+        'url': url,
+        'wall_ms': round((time.time() - started_at) * 1000, 1) if started_at else None,
+        'timing': _read_navigation_timing(driver),
+        'metrics': _read_performance_metrics(driver),
+        'resources': _to_resources(_read_network_events(driver)),
+    }
+    with _navigations_lock:
+        _navigations.append(navigation)
+    driver.trace_navigation = navigation
+
+
+def end_session(driver):
+    """
+    Drain Network events fired after the last navigation (e.g., purchase requests)
+
+    Must run before the driver quits, when the performance log is lost.
+    """
+    if not is_tracing_enabled():
+        return
+    _drain(driver)
+    driver.trace_navigation = None
+
+
+def _summarize(navigation: dict) -> dict:
+    """Build a compact summary of one navigation record"""
+    resources = navigation['resources']
+    timed = [r for r in resources if r['duration_ms'] is not None]
+    slowest = sorted(timed, key=lambda r: r['duration_ms'], reverse=True)[:SLOWEST_RESOURCE_COUNT]
+    return {
+        'username': navigation['username'],
+        'url': navigation['url'],
+        'wall_ms': navigation['wall_ms'],
+        **navigation['timing'],
+        'requests': len(resources),
+        'failed_requests': sum(1 for r in resources if r['failed']),
+        'bytes': sum(r['bytes'] for r in resources),
+        'slowest': [
+            {'url': r['url'], 'duration_ms': r['duration_ms'], 'bytes': r['bytes']}
+            for r in slowest
+        ],
+        'metrics': navigation['metrics'],
+    }
+
+
+def _to_har(navigations: list) -> dict:
+    """Build a minimal HAR 1.2 document from navigation records"""
+    pages = []
+    entries = []
+    for i, navigation in enumerate(navigations):
+        page_id = f"page_{i + 1}"
+        pages.append({
+            'id': page_id,
+            'title': navigation['url'],
+            'startedDateTime': '',
+            'pageTimings': {
+                'onContentLoad': navigation['timing'].get('dom_content_loaded_ms', -1),
+                'onLoad': navigation['timing'].get('load_ms', -1),
+            },
+        })
+        for resource in navigation['resources']:
+            started = resource['wall_time']
+            entries.append({
+                'pageref': page_id,
+                'startedDateTime': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(started)) if started else '',
+                'time': resource['duration_ms'] if resource['duration_ms'] is not None else -1,
+                'request': {'method': resource['method'], 'url': resource['url']},
+                'response': {
+                    'status': resource['status'] or 0,
+                    'content': {'mimeType': resource['mime_type'] or ''},
+                    'bodySize': resource['bytes'],
+                },
+                '_error': resource['failed'],
+            })
+    return {'log': {'version': '1.2', 'creator': {'name': 'lotto-automation'}, 'pages': pages, 'entries': entries}}
+
+
+def _upload(path: str, key: str):
+    """Upload a trace file to TRACE_S3_BUCKET if configured"""
+    bucket = os.environ.get('TRACE_S3_BUCKET')
+    if not bucket:
+        return
+    try:
+        get_s3_client().upload_file(path, bucket, key)
+        logger.info(f"Uploaded trace to s3://{bucket}/{key}")
+    except Exception as e:
+        logger.error(f"Failed to upload trace {path}: {e}")
+
+
+def flush_trace(run_id: str) -> list:
+    """
+    Write the per-run trace summary (and optional HAR) and reset state
+
+    Args:
+        run_id: Identifier of the invocation (e.g., aws_request_id)
+
+    Returns:
+        list of per-navigation summary dicts (empty if tracing is disabled)
+    """
+    global _navigations
+    with _navigations_lock:
+        navigations, _navigations = _navigations, []
+    if not is_tracing_enabled() or not navigations:
+        return []
+
+    summaries = [_summarize(navigation) for navigation in navigations]
+
+    for summary in summaries:
+        logger.info(
+            f"Trace {summary['username']} {summary['url']}: "
+            f"ttfb={summary.get('ttfb_ms')}ms dcl={summary.get('dom_content_loaded_ms')}ms "
+            f"load={summary.get('load_ms')}ms requests={summary['requests']} bytes={summary['bytes']:,}"
+        )
+
+    try:
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        summary_path = os.path.join(TRACE_DIR, f"{run_id}-summary.json")
+        with open(summary_path, 'w') as f:
+            json.dump(summaries, f, separators=(',', ':'))
+        _upload(summary_path, f"traces/{run_id}-summary.json")
+
+        if is_har_enabled():
+            har_path = os.path.join(TRACE_DIR, f"{run_id}.har.gz")
+            with gzip.open(har_path, 'wt') as f:
+                json.dump(_to_har(navigations), f, separators=(',', ':'))
+            _upload(har_path, f"traces/{run_id}.har.gz")
+    except Exception as e:
+        logger.error(f"Failed to write trace for {run_id}: {e}")
+
+    return summaries
@@ -0,0 +1,9 @@
+"""Make lambda/src modules and lambda/tools stand-ins importable"""
+import os
+import sys
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(LAMBDA_DIR, 'src'))
+sys.path.insert(0, os.path.join(LAMBDA_DIR, 'tools'))
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-2')
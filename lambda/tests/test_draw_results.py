@@ -0,0 +1,83 @@
+"""Local bitmask matching of lotto 6/45 tickets against draw results"""
+from datetime import datetime
+import pytest
+import draw_results
+from config import KST
+
+DRAWS = {
+    1100: {'round': 1100, 'date': '2023-12-30', 'numbers': [1, 2, 3, 4, 5, 6], 'bonus': 7, 'first_prize': 2000000000},
+    1101: {'round': 1101, 'date': '2024-01-06', 'numbers': [40, 41, 42, 43, 44, 45], 'bonus': 1, 'first_prize': 1500000000},
+}
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """Serve DRAWS (1102 not drawn yet) and record the rounds requested"""
+    rounds = []
+
+    def get_draw(round_no):
+        rounds.append(round_no)
+        return DRAWS.get(round_no)
+
+    monkeypatch.setattr(draw_results, 'get_draw', get_draw)
+    return rounds
+
+
+def ticket(numbers, round_no=1100, slot='A'):
+    return {'round': round_no, 'slot': slot, 'numbers': numbers}
+
+
+@pytest.mark.parametrize('numbers, matched, bonus_matched, rank, prize', [
+    ([1, 2, 3, 4, 5, 6], 6, False, 1, 2000000000),
+    ([1, 2, 3, 4, 5, 7], 5, True, 2, None),
+    ([1, 2, 3, 4, 5, 45], 5, False, 3, None),
+    ([1, 2, 3, 4, 7, 45], 4, True, 4, 50000),
+    ([1, 2, 3, 43, 44, 45], 3, False, 5, 5000),
+    ([1, 2, 7, 43, 44, 45], 2, True, None, None),
+])
+def test_ranks_and_prizes(fetched, numbers, matched, bonus_matched, rank, prize):
+    [result] = draw_results.match_tickets([ticket(numbers)])
+
+    assert result['drawn'] is True
+    assert result['matched'] == matched
+    assert result['bonus_matched'] is bonus_matched
+    assert result['rank'] == rank
+    assert result['prize'] == prize
+
+
+def test_tickets_keep_their_fields_and_order(fetched):
+    tickets = [ticket([40, 41, 42, 43, 44, 45], 1101, 'B'), ticket([1, 2, 3, 4, 5, 6], 1100, 'A')]
+
+    results = draw_results.match_tickets(tickets)
+
+    assert [(r['round'], r['slot'], r['numbers']) for r in results] == [
+        (1101, 'B', [40, 41, 42, 43, 44, 45]),
+        (1100, 'A', [1, 2, 3, 4, 5, 6]),
+    ]
+    assert [r['rank'] for r in results] == [1, 1]
+    assert [r['prize'] for r in results] == [1500000000, 2000000000]
+
+
+def test_each_round_is_fetched_once(fetched):
+    tickets = [ticket([1, 2, 3, 4, 5, 6], 1100, slot) for slot in 'ABCDE'] + [ticket([1, 2, 3, 4, 5, 6], 1101)]
+
+    draw_results.match_tickets(tickets)
+
+    assert sorted(fetched) == [1100, 1101]
+
+
+def test_undrawn_round_is_not_matched(fetched):
+    [result] = draw_results.match_tickets([ticket([1, 2, 3, 4, 5, 6], 1102)])
+
+    assert result['drawn'] is False
+    assert result['matched'] is None
+    assert result['rank'] is None
+    assert result['prize'] is None
+
+
+def test_latest_drawn_round_changes_on_saturday_evening():
+    before = datetime(2024, 1, 6, 20, 0, tzinfo=KST)
+    after = datetime(2024, 1, 6, 21, 0, tzinfo=KST)
+
+    assert draw_results.latest_drawn_round(before) == 1100
+    assert draw_results.latest_drawn_round(after) == 1101
@@ -0,0 +1,90 @@
+"""Step-level retry and checkpoint resume of the flow engine"""
+import pytest
+import flows
+
+STEPS = [
+    flows.navigate('open', 'https://example.test/game', 'game'),
+    flows.click('pick', 'num1'),
+    flows.confirm('buy', 'btnBuy'),
+    flows.verify('check'),
+]
+
+
+@pytest.fixture(autouse=True)
+def no_delay(monkeypatch):
+    monkeypatch.setattr(flows, 'RETRY_DELAY_SECONDS', 0)
+
+
+class ScriptedSteps:
+    """run_step stand-in failing each step as often as scripted"""
+
+    def __init__(self, failures: dict = None):
+        self.failures = dict(failures or {})
+        self.calls = []
+
+    def __call__(self, driver, username, step):
+        self.calls.append(step['name'])
+        if self.failures.get(step['name'], 0) > 0:
+            self.failures[step['name']] -= 1
+            raise RuntimeError(f"{step['name']} failed")
+        return step['name']
+
+
+def test_clean_run_returns_last_step_result():
+    run_step = ScriptedSteps()
+
+    outcome = flows.run_flow(None, 'id1', STEPS, run_step)
+
+    assert run_step.calls == ['open', 'pick', 'buy', 'check']
+    assert outcome == {'result': 'check', 'retries': 0, 'resumes': 0}
+
+
+def test_failing_step_is_retried_after_recover():
+    run_step = ScriptedSteps({'pick': 2})
+    recovered = []
+
+    outcome = flows.run_flow(None, 'id1', STEPS, run_step, recover=lambda driver, username: recovered.append(username))
+
+    assert run_step.calls == ['open', 'pick', 'pick', 'pick', 'buy', 'check']
+    assert recovered == ['id1', 'id1']
+    assert outcome['retries'] == 2
+    assert outcome['resumes'] == 0
+
+
+def test_exhausted_retries_resume_from_checkpoint():
+    run_step = ScriptedSteps({'pick': 3})
+
+    outcome = flows.run_flow(None, 'id1', STEPS, run_step)
+
+    assert run_step.calls == ['open', 'pick', 'pick', 'pick', 'open', 'pick', 'buy', 'check']
+    assert outcome['resumes'] == 1
+
+
+def test_step_failing_after_resume_raises_flow_error():
+    run_step = ScriptedSteps({'pick': 6})
+
+    with pytest.raises(flows.FlowError) as excinfo:
+        flows.run_flow(None, 'id1', STEPS, run_step)
+
+    assert excinfo.value.step['name'] == 'pick'
+    assert run_step.calls.count('open') == 2
+
+
+@pytest.mark.parametrize('name', ['buy', 'check'])
+def test_confirm_and_verify_are_never_retried(name):
+    run_step = ScriptedSteps({name: 1})
+
+    with pytest.raises(flows.FlowError) as excinfo:
+        flows.run_flow(None, 'id1', STEPS, run_step)
+
+    assert excinfo.value.step['name'] == name
+    assert run_step.calls.count('buy') == 1
+    assert run_step.calls.count('open') == 1
+
+
+def test_flow_abort_stops_without_retry():
+    def run_step(driver, username, step):
+        raise flows.FlowAbort('login required')
+
+    with pytest.raises(flows.FlowAbort):
+        flows.run_flow(None, 'id1', STEPS, run_step)
@@ -0,0 +1,92 @@
+"""Budget and balance caps of the pension 720+ reservation planner"""
+from datetime import datetime
+import pytest
+import pension_planner
+from config import KST
+
+NOW = datetime(2024, 1, 8, 12, 0, tzinfo=KST)
+NEXT_ROUND = pension_planner.next_pension_round(NOW)
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    """Stored pension rounds of the account (empty by default)"""
+    rounds = set()
+    monkeypatch.setattr(pension_planner, 'get_pension_rounds', lambda username, min_round=None, max_round=None: rounds)
+    monkeypatch.delenv('PENSION_RESERVE_ROUNDS', raising=False)
+    return rounds
+
+
+def plan(**kwargs) -> dict:
+    return pension_planner.plan_pension('id1', now=NOW, **kwargs)
+
+
+def test_default_budget_reserves_a_full_batch(stored):
+    result = plan(balance=100000)
+
+    assert result['rounds'] == pension_planner.MAX_RESERVE_ROUNDS
+    assert result['next_round'] == NEXT_ROUND
+
+
+@pytest.mark.parametrize('weekly_budget, rounds', [
+    (5000, 0),
+    (6000, 1),
+    (8000, 3),
+    (20000, 5),
+])
+def test_weekly_budget_caps_rounds(stored, weekly_budget, rounds):
+    assert plan(balance=100000, weekly_budget=weekly_budget)['rounds'] == rounds
+
+
+@pytest.mark.parametrize('balance, rounds', [
+    (0, 0),
+    (999, 0),
+    (1000, 1),
+    (6999, 1),
+    # 2 rounds + the following week's lotto
+    (7000, 2),
+    (24999, 4),
+    (25000, 5),
+])
+def test_balance_keeps_lotto_of_covered_weeks(stored, balance, rounds):
+    result = plan(balance=balance)
+
+    assert result['rounds'] == rounds
+    assert rounds * pension_planner.PENSION_PRICE + max(0, rounds - 1) * 5000 <= balance
+
+
+def test_unknown_balance_is_capped_by_budget_only(stored):
+    assert plan(balance=None, weekly_budget=7000)['rounds'] == 2
+
+
+def test_reserve_rounds_setting_is_clamped(stored, monkeypatch):
+    monkeypatch.setenv('PENSION_RESERVE_ROUNDS', '2')
+    assert plan(balance=100000)['rounds'] == 2
+
+    monkeypatch.setenv('PENSION_RESERVE_ROUNDS', '9')
+    assert plan(balance=100000)['rounds'] == pension_planner.MAX_RESERVE_ROUNDS
+
+
+def test_covered_next_round_is_skipped(stored):
+    stored.update({NEXT_ROUND, NEXT_ROUND + 1})
+
+    result = plan(balance=100000)
+
+    assert result['rounds'] == 0
+    assert f"through round {NEXT_ROUND + 1}" in result['message']
+
+
+def test_gap_at_next_round_is_not_covered(stored):
+    stored.update({NEXT_ROUND + 1, NEXT_ROUND + 2})
+
+    assert pension_planner.covered_rounds('id1', NEXT_ROUND) == 0
+    assert plan(balance=100000)['rounds'] == pension_planner.MAX_RESERVE_ROUNDS
+
+
+def test_record_reservation_covers_planned_rounds(stored, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(pension_planner, 'add_pension_reservation', lambda *args: recorded.append(args))
+
+    pension_planner.record_reservation('id1', plan(balance=100000, weekly_budget=8000))
+
+    assert recorded == [('id1', NEXT_ROUND, 3)]
@@ -0,0 +1,165 @@
+"""Credential providers against the in-memory Secrets Manager stand-in"""
+import pytest
+import secrets_manager
+from fake_secrets import InMemorySecretsClient
+
+MAIN_SECRET = 'lotto-automation/credentials'
+
+
+def account_secret(i: int) -> str:
+    return f"lotto-automation/accounts/id{i}"
+
+
+@pytest.fixture
+def client():
+    """Install a fresh stand-in client (and empty cache) per test"""
+    def install(secrets: dict, denied: list = None) -> InMemorySecretsClient:
+        fake = InMemorySecretsClient(secrets, denied)
+        secrets_manager.set_secrets_client(fake)
+        return fake
+
+    yield install
+    secrets_manager.set_secrets_client(None)
+
+
+def per_account_secrets(count: int) -> dict:
+    secrets = {MAIN_SECRET: {'accountSecrets': [account_secret(i) for i in range(count)]}}
+    for i in range(count):
+        secrets[account_secret(i)] = {'username': f"id{i}", 'password': f"pw{i}"}
+    return secrets
+
+
+class NoBatchClient:
+    """Client of an older boto3 without batch_get_secret_value"""
+
+    def __init__(self, inner: InMemorySecretsClient):
+        self.inner = inner
+
+    def get_secret_value(self, SecretId: str):
+        return self.inner.get_secret_value(SecretId=SecretId)
+
+
+def test_single_secret_layout(client):
+    client({MAIN_SECRET: {'accounts': [
+        {'username': 'id1', 'password': 'pw1'},
+        {'username': 'id2', 'password': 'pw2'},
+    ]}})
+
+    provider = secrets_manager.get_credential_provider(MAIN_SECRET)
+
+    assert isinstance(provider, secrets_manager.SingleSecretProvider)
+    assert provider.list_account_ids() == [0, 1]
+    assert [c['username'] for c in provider.get_credentials([1])] == ['id2']
+    assert [c['username'] for c in secrets_manager.get_all_credentials(MAIN_SECRET)] == ['id1', 'id2']
+
+
+def test_single_secret_requires_accounts(client):
+    client({MAIN_SECRET: {'lowBalanceThreshold': 1000}})
+
+    with pytest.raises(ValueError, match="'accounts'"):
+        secrets_manager.get_credential_provider(MAIN_SECRET)
+
+
+def test_per_account_secrets_are_fetched_in_batches_of_20(client):
+    fake = client(per_account_secrets(45))
+
+    provider = secrets_manager.get_credential_provider(MAIN_SECRET)
+    credentials = provider.get_credentials(provider.list_account_ids())
+
+    assert isinstance(provider, secrets_manager.PerAccountSecretProvider)
+    assert [c['username'] for c in credentials] == [f"id{i}" for i in range(45)]
+    assert [len(batch) for batch in fake.batches] == [20, 20, 5]
+    # Only the main secret is read one by one
+    assert fake.calls['get_secret_value'] == 1
+
+
+def test_falls_back_to_get_secret_value_without_batch_api(client):
+    fake = client(per_account_secrets(3))
+    secrets_manager.set_secrets_client(NoBatchClient(fake))
+
+    credentials = secrets_manager.get_all_credentials(MAIN_SECRET)
+
+    assert [c['username'] for c in credentials] == ['id0', 'id1', 'id2']
+    assert fake.calls['batch_get_secret_value'] == 0
+    assert fake.calls['get_secret_value'] == 4
+
+
+def test_missing_secret_maps_to_value_error(client):
+    client({})
+
+    with pytest.raises(ValueError, match='Secret not found'):
+        secrets_manager.get_secret_json(MAIN_SECRET)
+
+
+def test_missing_account_secret_in_batch_maps_to_value_error(client):
+    secrets = per_account_secrets(2)
+    del secrets[account_secret(1)]
+    client(secrets)
+
+    with pytest.raises(ValueError, match=f"Secret not found: {account_secret(1)}"):
+        secrets_manager.get_all_credentials(MAIN_SECRET)
+
+
+def test_access_denied_maps_to_permission_error(client):
+    client({MAIN_SECRET: {'accounts': []}}, denied=[MAIN_SECRET])
+
+    with pytest.raises(PermissionError, match='Access denied'):
+        secrets_manager.get_secret_json(MAIN_SECRET)
+
+
+def test_access_denied_in_batch_maps_to_permission_error(client):
+    client(per_account_secrets(2), denied=[account_secret(0)])
+
+    with pytest.raises(PermissionError, match=f"Access denied to secret: {account_secret(0)}"):
+        secrets_manager.get_all_credentials(MAIN_SECRET)
+
+
+def test_incomplete_provider_fails_at_instantiation():
+    class ListOnlyProvider(secrets_manager.CredentialProvider):
+        def list_account_ids(self) -> list:
+            return [0]
+
+    with pytest.raises(TypeError, match='iter_credentials'):
+        ListOnlyProvider()
+
+
+def test_select_shard_splits_round_robin():
+    ids = list(range(7))
+
+    assert secrets_manager.select_shard(ids) == ids
+    assert secrets_manager.select_shard(ids, 0, 3) == [0, 3, 6]
+    assert secrets_manager.select_shard(ids, 2, 3) == [2, 5]
+    assert sorted(sum((secrets_manager.select_shard(ids, i, 3) for i in range(3)), [])) == ids
+
+
+@pytest.mark.parametrize('shard_index', [-1, 3])
+def test_select_shard_rejects_out_of_range_index(shard_index):
+    with pytest.raises(ValueError, match='Invalid shard'):
+        secrets_manager.select_shard(list(range(7)), shard_index, 3)
+
+
+def test_cached_secret_is_reused_within_ttl(client, monkeypatch):
+    monkeypatch.setenv('SECRET_CACHE_TTL', '300')
+    fake = client({MAIN_SECRET: {'accounts': [], 'lowBalanceThreshold': 1000}})
+
+    secrets_manager.get_secret_json(MAIN_SECRET)
+    assert secrets_manager.get_low_balance_threshold(MAIN_SECRET) == 1000
+    assert fake.calls['get_secret_value'] == 1
+
+
+def test_expired_secret_is_fetched_again(client, monkeypatch):
+    monkeypatch.setenv('SECRET_CACHE_TTL', '0')
+    fake = client({MAIN_SECRET: {'accounts': []}})
+
+    secrets_manager.get_secret_json(MAIN_SECRET)
+    secrets_manager.get_secret_json(MAIN_SECRET)
+    assert fake.calls['get_secret_value'] == 2
+
+
+def test_cached_account_secrets_skip_the_batch_call(client, monkeypatch):
+    monkeypatch.setenv('SECRET_CACHE_TTL', '300')
+    fake = client(per_account_secrets(3))
+
+    secrets_manager.get_all_credentials(MAIN_SECRET)
+    secrets_manager.get_all_credentials(MAIN_SECRET)
+    assert fake.calls['batch_get_secret_value'] == 1
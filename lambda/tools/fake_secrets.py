@@ -0,0 +1,78 @@
+"""
+In-memory Secrets Manager Stand-in
+Implements the subset of the boto3 'secretsmanager' client used by secrets_manager.py
+
+Usage:
+    import secrets_manager
+    secrets_manager.set_secrets_client(InMemorySecretsClient({
+        'lotto-automation/credentials': {'accounts': [{'username': 'id1', 'password': 'pw1'}]},
+    }))
+"""
+import json
+from botocore.exceptions import ClientError
+
+
+class InMemorySecretsClient:
+    """
+    Local secretsmanager client backed by a dict
+
+    Args:
+        secrets: dict of secret name -> payload (dict is JSON-encoded, str is used as-is)
+        denied: secret names that fail with AccessDeniedException
+    """
+
+    def __init__(self, secrets: dict = None, denied: list = None):
+        self.secrets = {}
+        self.denied = set(denied or [])
+        self.calls = {'get_secret_value': 0, 'batch_get_secret_value': 0}
+        self.batches = []
+        for name, value in (secrets or {}).items():
+            self.put_secret_value(name, value)
+
+    def put_secret_value(self, name: str, value):
+        self.secrets[name] = value if isinstance(value, str) else json.dumps(value)
+
+    def _arn(self, name: str) -> str:
+        return f"arn:aws:secretsmanager:ap-northeast-2:000000000000:secret:{name}"
+
+    def get_secret_value(self, SecretId: str):
+        self.calls['get_secret_value'] += 1
+        if SecretId in self.denied:
+            raise ClientError(
+                {'Error': {'Code': 'AccessDeniedException', 'Message': f"Access to {SecretId} denied"}},
+                'GetSecretValue',
+            )
+        if SecretId not in self.secrets:
+            raise ClientError(
+                {'Error': {'Code': 'ResourceNotFoundException', 'Message': f"Secret {SecretId} not found"}},
+                'GetSecretValue',
+            )
+        return {'Name': SecretId, 'ARN': self._arn(SecretId), 'SecretString': self.secrets[SecretId]}
+
+    def batch_get_secret_value(self, SecretIdList: list):
+        self.calls['batch_get_secret_value'] += 1
+        self.batches.append(list(SecretIdList))
+        if len(SecretIdList) > 20:
+            raise ClientError(
+                {'Error': {'Code': 'InvalidParameterException', 'Message': 'Too many secret IDs'}},
+                'BatchGetSecretValue',
+            )
+
+        values = []
+        errors = []
+        for secret_id in SecretIdList:
+            if secret_id in self.denied:
+                errors.append({
+                    'SecretId': secret_id,
+                    'ErrorCode': 'AccessDeniedException',
+                    'Message': f"Access to {secret_id} denied",
+                })
+            elif secret_id in self.secrets:
+                values.append({'Name': secret_id, 'ARN': self._arn(secret_id), 'SecretString': self.secrets[secret_id]})
+            else:
+                errors.append({
+                    'SecretId': secret_id,
+                    'ErrorCode': 'ResourceNotFoundException',
+                    'Message': f"Secret {secret_id} not found",
+                })
+        return {'SecretValues': values, 'Errors': errors}
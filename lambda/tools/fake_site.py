@@ -0,0 +1,300 @@
+"""
+Local dhlottery.co.kr Stand-in
+Minimal HTTP server serving the pages and element IDs used by lotto.py
+
+Usage:
+    python fake_site.py --port 8765 --latency 50
+
+Point the Lambda code at it with SITE_URL_OVERRIDE=http://127.0.0.1:8765
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# Per-account state shared by all request threads
+_state_lock = threading.Lock()
+_accounts = {}
+
+DEFAULT_BALANCE = 50000
+LOTTO_PRICE = 1000
+PENSION_PRICE = 1000
+
+LOGIN_PAGE = '''<html><head><title>로그인</title></head><body>
+<form id="loginForm" method="post" action="/login">
+  <input type="text" id="inpUserId" name="userId">
+  <input type="password" id="inpUserPswdEncn" name="password">
+  <input type="submit" id="btnLogin" value="로그인">
+</form>
+</body></html>'''
+
+HOME_PAGE = '''<html><head><title>동행복권</title></head><body><div id="home">{username}</div></body></html>'''
+
+GAME645_PAGE = '''<html><head><title>로또6/45</title></head><body>
+<div id="popupLayerAlert" style="display:none"><span></span><input type="button" value="확인"></div>
+<ul id="tabWay2Buy"><li><a>혼합선택</a></li><li><a>자동번호발급</a></li></ul>
+<select id="amoundApply"><option>1</option><option>2</option><option>3</option><option>4</option><option>5</option></select>
+<input type="button" id="btnSelectNum" value="확인">
+<input type="button" id="btnBuy" value="구매하기"
+  onclick="document.getElementById('popupLayerConfirm').style.display='block'">
+<div id="popupLayerConfirm" style="display:none"><div>
+  <div>구매하시겠습니까?</div>
+  <div>
+    <input type="button" value="확인" onclick="buy()">
+    <input type="button" value="취소">
+  </div>
+</div></div>
+<div id="result"></div>
+<script>
+function buy() {{
+  var count = document.getElementById('amoundApply').selectedIndex + 1;
+  fetch('/olotto/game/execBuy.do?count=' + count, {{method: 'POST'}})
+    .then(function (r) {{ return r.text(); }})
+    .then(function (t) {{
+      document.getElementById('popupLayerConfirm').style.display = 'none';
+      document.getElementById('result').innerHTML = t;
+    }});
+}}
+</script>
+</body></html>'''
+
+MYPAGE_HOME = '''<html><head><title>마이페이지</title></head><body>
+<div id="divCrntEntrsAmt">{balance:,}원</div>
+</body></html>'''
+
+LEDGER_PAGE = '''<html><head><title>구매/당첨내역</title></head><body>
+<button id="btnSrch" onclick="document.getElementById('winning-history-list').style.display='block'">조회</button>
+<div id="winning-history-list" style="display:none">
+  <ul><li>header</li></ul>
+  <ul>{rows}</ul>
+</div>
+</body></html>'''
+
+LEDGER_ROW = '<li><div>1</div><div>2</div><div>3</div><div>4</div><div>5</div><div><span>결과</span><span>{result}</span></div></li>'
+
+TOTAL_GAME_PAGE = '''<html><head><title>연금복권720+</title></head><body>
+<div id="popupLayerAlert" style="display:none"></div>
+<iframe id="ifrm_tab" src="/game/pension720.jsp" width="1000" height="800"></iframe>
+</body></html>'''
+
+PENSION_FRAME = '''<html><body>
+<form id="frm"><div><ul>
+  <li><a>번호선택</a></li><li><a>자동</a></li><li><a href="#" onclick="showTab2(); return false;">예약구매</a></li>
+</ul></div></form>
+<div id="tab2" style="display:none">
+  <div>
+    <div>
+      <div><a href="#">조회</a></div>
+      <div><a>1주</a><a>2주</a><a>3주</a><a>4주</a><a href="#">전체</a></div>
+    </div>
+    <div><ul><li><span>{reservation}</span><span>{rounds}</span></li></ul></div>
+  </div>
+  <select id="repeatRound"><option>1</option><option>2</option><option>3</option><option>4</option><option>5</option></select>
+  <ul><li></li><li></li><li></li><li></li><li><a href="#" onclick="showConfirm(); return false;">구매하기</a></li></ul>
+</div>
+<div id="resevationConfirm" style="display:none"><div>
+  <div>예약</div><div>예약하시겠습니까?</div>
+  <div><a href="#" onclick="reserve(); return false;">확인</a><a href="#">취소</a></div>
+</div></div>
+<div id="result"></div>
+<script>
+function showTab2() {{ document.getElementById('tab2').style.display = 'block'; }}
+function showConfirm() {{ document.getElementById('resevationConfirm').style.display = 'block'; }}
+function reserve() {{
+  var rounds = document.getElementById('repeatRound').selectedIndex + 1;
+  fetch('/game/reserve.jsp?rounds=' + rounds, {{method: 'POST'}})
+    .then(function (r) {{ return r.text(); }})
+    .then(function (t) {{
+      document.getElementById('resevationConfirm').style.display = 'none';
+      document.getElementById('result').innerHTML = t;
+    }});
+}}
+</script>
+</body></html>'''
+
+
+def get_account(username: str) -> dict:
+    """Get or create the in-memory state of an account"""
+    with _state_lock:
+        return _accounts.setdefault(username, {
+            'balance': DEFAULT_BALANCE,
+            'tickets': 0,
+            'reserved_rounds': 0,
+        })
+
+
+def upcoming_round(first_draw: datetime = datetime(2002, 12, 7, 21, 0)) -> int:
+    """Round of the next lotto 6/45 draw"""
+    return (datetime.now() - first_draw).days // 7 + 2
+
+
+def lotto_receipt(count: int) -> str:
+    """Purchase receipt with auto-picked games"""
+    rows = ''.join(
+        f"<li>{slot} 자동 {' '.join(f'{n:02d}' for n in sorted(random.sample(range(1, 46), 6)))}</li>"
+        for slot in 'ABCDE'[:count]
+    )
+    return f'구매완료<div id="popReceipt"><span id="buyRound">제 {upcoming_round()} 회</span><ul id="reportRow">{rows}</ul></div>'
+
+
+def pension_receipt(rounds: int) -> str:
+    """Reservation receipt with one ticket per reserved round"""
+    first = upcoming_round(datetime(2020, 5, 7, 19, 5))
+    lines = ''.join(
+        f"<li>{first + i}회 {random.randint(1, 5)}조 {random.randint(0, 999999):06d}</li>"
+        for i in range(rounds)
+    )
+    return f'구매완료<ul>{lines}</ul>'
+
+
+def draw_result(round_no: int) -> dict:
+    """Deterministic draw result for a round, in the official API format"""
+    numbers = random.Random(round_no).sample(range(1, 46), 7)
+    result = {
+        'returnValue': 'success',
+        'drwNo': round_no,
+        'drwNoDate': '2025-01-04',
+        'bnusNo': numbers[6],
+        'firstWinamnt': 2000000000,
+    }
+    for i, number in enumerate(sorted(numbers[:6]), start=1):
+        result[f'drwtNo{i}'] = number
+    return result
+
+
+class FakeSiteHandler(BaseHTTPRequestHandler):
+    """Request handler emulating the dhlottery pages"""
+
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _username(self):
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        return cookie['session'].value if 'session' in cookie else None
+
+    def _send(self, body: str, status: int = 200, headers: dict = None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def do_GET(self):
+        self._delay()
+        parts = urlsplit(self.path)
+        username = self._username()
+        path = parts.path
+
+        if path == '/login':
+            return self._send(LOGIN_PAGE)
+        if path == '/common.do':
+            return self._send(json.dumps(draw_result(int(parse_qs(parts.query).get('drwNo', ['1'])[0]))))
+        if path in ('/', '/main'):
+            return self._send(HOME_PAGE.format(username=username or ''))
+        if username is None:
+            return self._send(LOGIN_PAGE)
+
+        account = get_account(username)
+        if path == '/olotto/game/game645.do':
+            return self._send(GAME645_PAGE.format())
+        if path == '/mypage/home':
+            return self._send(MYPAGE_HOME.format(balance=account['balance']))
+        if path == '/mypage/mylotteryledger':
+            rows = ''.join(LEDGER_ROW.format(result='미추첨') for _ in range(account['tickets']))
+            return self._send(LEDGER_PAGE.format(rows=rows))
+        if path == '/game/TotalGame.jsp':
+            return self._send(TOTAL_GAME_PAGE)
+        if path == '/game/pension720.jsp':
+            reserved = account['reserved_rounds'] > 0
+            return self._send(PENSION_FRAME.format(
+                reservation='예약중' if reserved else '예약없음',
+                rounds=account['reserved_rounds'],
+            ))
+        return self._send('Not Found', status=404)
+
+    def do_POST(self):
+        self._delay()
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        path = parts.path
+
+        if path == '/login':
+            length = int(self.headers.get('Content-Length', 0))
+            form = parse_qs(self.rfile.read(length).decode('utf-8'))
+            username = form.get('userId', [''])[0]
+            get_account(username)
+            self.send_response(302)
+            self.send_header('Set-Cookie', f'session={username}; Path=/')
+            self.send_header('Location', '/main')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        username = self._username()
+        if username is None:
+            return self._send('세션이 만료되었습니다', status=401)
+
+        account = get_account(username)
+        with _state_lock:
+            if path == '/olotto/game/execBuy.do':
+                count = int(query.get('count', ['1'])[0])
+                if account['balance'] < count * LOTTO_PRICE:
+                    return self._send('잔액이 부족합니다')
+                account['balance'] -= count * LOTTO_PRICE
+                account['tickets'] += count
+                return self._send(lotto_receipt(count))
+            if path == '/game/reserve.jsp':
+                rounds = int(query.get('rounds', ['1'])[0])
+                if account['balance'] < rounds * PENSION_PRICE:
+                    return self._send('잔액이 부족합니다')
+                account['balance'] -= rounds * PENSION_PRICE
+                account['reserved_rounds'] += rounds
+                return self._send(pension_receipt(rounds))
+        return self._send('Not Found', status=404)
+
+
+def start_server(port: int = 0, latency_ms: int = 0) -> ThreadingHTTPServer:
+    """
+    Start the stand-in in a background thread
+
+    Args:
+        port: Port to listen on (0 picks a free port)
+        latency_ms: Artificial delay added to every request
+
+    Returns:
+        the running server; base URL is http://127.0.0.1:{server.server_port}
+    """
+    FakeSiteHandler.latency = latency_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeSiteHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local dhlottery.co.kr stand-in')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=int, default=0, help='Per-request delay in ms')
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.latency)
+    print(f"Serving on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,248 @@
+"""
+Multi-account Load and Soak Test Harness
+Calls handler.lambda_handler in-process with synthetic accounts against the local site stand-in
+
+Usage:
+    python load_test.py --action check_balance --accounts 1,4,8 --concurrency 1,2,4 --iterations 3
+
+Reports per (accounts, concurrency) combination:
+    throughput (accounts/min), account latency p50/p90/p99, peak RSS (self + children),
+    leftover /tmp usage and leaked/zombie Chrome processes after each iteration
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-2')
+
+import fake_site  # noqa: E402
+import fake_secrets  # noqa: E402
+from resources import read_processes, chrome_processes, path_size  # noqa: E402
+from run_history import percentile  # noqa: E402
+
+TMP_PREFIXES = ('chrome-', 'lotto-', '.com.google.Chrome', '.org.chromium.')
+
+
+class FakeContext:
+    """Minimal Lambda context object"""
+
+    def __init__(self, request_id: str):
+        self.aws_request_id = request_id
+        self.function_name = 'lotto-automation-loadtest'
+
+
+def tree_rss_kb(root_pid: int) -> int:
+    """Sum RSS of a process and all of its descendants"""
+    processes = read_processes()
+    children = {}
+    for pid, (_, _, ppid, _) in processes.items():
+        children.setdefault(ppid, []).append(pid)
+
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        if pid in processes:
+            total += processes[pid][3]
+        stack.extend(children.get(pid, []))
+    return total
+
+
+def tmp_usage_bytes(tmp_dir: str = '/tmp') -> int:
+    """Total size of Chrome/lotto artifacts left in /tmp"""
+    total = 0
+    for entry in os.listdir(tmp_dir):
+        if not entry.startswith(TMP_PREFIXES):
+            continue
+        total += path_size(os.path.join(tmp_dir, entry))
+    return total
+
+
+class RssSampler(threading.Thread):
+    """Background sampler tracking peak RSS of this process tree"""
+
+    def __init__(self, interval: float = 0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        pid = os.getpid()
+        while not self._stop_event.is_set():
+            self.peak_kb = max(self.peak_kb, tree_rss_kb(pid))
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        return self.peak_kb
+
+
+def install_account_timer(handler, latencies: list):
+    """Wrap handler.process_account to record per-account latency"""
+    original = handler.process_account
+    lock = threading.Lock()
+
+    def timed_process_account(action, username, password):
+        started = time.time()
+        try:
+            return original(action, username, password)
+        finally:
+            with lock:
+                latencies.append(time.time() - started)
+
+    handler.process_account = timed_process_account
+    return original
+
+
+def install_accounts(secret_name: str, account_count: int, per_account_secrets: bool):
+    """Serve synthetic accounts from the in-memory Secrets Manager stand-in"""
+    import secrets_manager
+
+    accounts = [
+        {'username': f'loadtest{i:04d}', 'password': 'password'}
+        for i in range(account_count)
+    ]
+    secrets = {}
+    if per_account_secrets:
+        account_secrets = [f'lotto-automation/accounts/{a["username"]}' for a in accounts]
+        secrets[secret_name] = {'accountSecrets': account_secrets}
+        secrets.update(zip(account_secrets, accounts))
+    else:
+        secrets[secret_name] = {'accounts': accounts}
+    secrets_manager.set_secrets_client(fake_secrets.InMemorySecretsClient(secrets))
+
+
+def run_scenario(handler, action: str, account_count: int, concurrency: int, iterations: int,
+                 per_account_secrets: bool = False) -> dict:
+    """Run one (accounts, concurrency) combination for several iterations"""
+    install_accounts(os.environ['SECRET_NAME'], account_count, per_account_secrets)
+    os.environ['MAX_CONCURRENT_ACCOUNTS'] = str(concurrency)
+    os.environ['MAX_BROWSER_CONTEXTS'] = str(concurrency)
+    import browser_pool
+    browser_pool._context_slots = None  # re-read MAX_BROWSER_CONTEXTS
+
+    baseline_chrome = set(chrome_processes())
+    latencies = []
+    original = install_account_timer(handler, latencies)
+    iteration_reports = []
+    sampler = RssSampler()
+    sampler.start()
+    started = time.time()
+
+    try:
+        for iteration in range(iterations):
+            iteration_started = time.time()
+            response = handler.lambda_handler(
+                {'action': action},
+                FakeContext(f'loadtest-{account_count}-{concurrency}-{iteration}'),
+            )
+            body = json.loads(response['body'])
+            leaked = {
+                pid: state for pid, state in chrome_processes().items()
+                if pid not in baseline_chrome
+            }
+            iteration_reports.append({
+                'iteration': iteration + 1,
+                'status_code': response['statusCode'],
+                'duration_s': round(time.time() - iteration_started, 2),
+                'errors': len(body.get('errors', [])),
+                'tmp_bytes': tmp_usage_bytes(),
+                'leaked_chrome_processes': len(leaked),
+                'zombie_chrome_processes': sum(1 for state in leaked.values() if state == 'Z'),
+                'rss_kb': tree_rss_kb(os.getpid()),
+            })
+            print(f"  iteration {iteration + 1}/{iterations}: {iteration_reports[-1]}", flush=True)
+    finally:
+        elapsed = time.time() - started
+        peak_kb = sampler.stop()
+        handler.process_account = original
+
+    processed = account_count * iterations
+    return {
+        'accounts': account_count,
+        'concurrency': concurrency,
+        'iterations': iterations,
+        'throughput_accounts_per_min': round(processed / elapsed * 60, 2) if elapsed else 0,
+        'latency_p50_s': round(percentile(latencies, 50), 2),
+        'latency_p90_s': round(percentile(latencies, 90), 2),
+        'latency_p99_s': round(percentile(latencies, 99), 2),
+        'peak_rss_mb': round(peak_kb / 1024, 1),
+        'final_tmp_bytes': iteration_reports[-1]['tmp_bytes'] if iteration_reports else 0,
+        'max_leaked_chrome_processes': max((r['leaked_chrome_processes'] for r in iteration_reports), default=0),
+        'iterations_detail': iteration_reports,
+    }
+
+
+def parse_int_list(value: str) -> list:
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Multi-account load and soak test for lambda_handler')
+    parser.add_argument('--action', default='check_balance',
+                        help='Lambda action (buy_ticket, buy_pension_ticket, check_balance, check_result)')
+    parser.add_argument('--accounts', default='1,2,4', help='Comma-separated account counts to sweep')
+    parser.add_argument('--concurrency', default='1,2', help='Comma-separated concurrency levels to sweep')
+    parser.add_argument('--iterations', type=int, default=3, help='Warm invocations per combination')
+    parser.add_argument('--site-url', help='Use an already running site stand-in instead of starting one')
+    parser.add_argument('--latency', type=int, default=0, help='Per-request delay of the started stand-in (ms)')
+    parser.add_argument('--per-account-secrets', action='store_true',
+                        help='Store each synthetic account in its own secret')
+    parser.add_argument('--shared-browser', action='store_true',
+                        help='Serve all accounts from one Chrome with isolated browser contexts')
+    parser.add_argument('--output', help='Write the JSON report to this path')
+    args = parser.parse_args()
+
+    server = None
+    if args.site_url:
+        site_url = args.site_url
+    else:
+        server = fake_site.start_server(latency_ms=args.latency)
+        site_url = f'http://127.0.0.1:{server.server_port}'
+
+    os.environ['SITE_URL_OVERRIDE'] = site_url
+    os.environ.setdefault('SECRET_NAME', 'lotto-automation/loadtest')
+    os.environ.pop('SNS_TOPIC_ARN', None)
+    if args.shared_browser:
+        os.environ['CHROME_SHARED_BROWSER'] = '1'
+
+    import handler
+
+    print(f"Site: {site_url}, action: {args.action}", flush=True)
+    report = []
+    try:
+        for account_count in parse_int_list(args.accounts):
+            for concurrency in parse_int_list(args.concurrency):
+                if concurrency > account_count:
+                    continue
+                print(f"accounts={account_count} concurrency={concurrency}", flush=True)
+                report.append(run_scenario(handler, args.action, account_count, concurrency, args.iterations,
+                                           args.per_account_secrets))
+    finally:
+        if server:
+            server.shutdown()
+
+    print()
+    print(f"{'accounts':>8} {'conc':>4} {'acc/min':>8} {'p50 s':>7} {'p90 s':>7} {'p99 s':>7} "
+          f"{'peak MB':>8} {'tmp KB':>8} {'leaked':>6}")
+    for row in report:
+        print(f"{row['accounts']:>8} {row['concurrency']:>4} {row['throughput_accounts_per_min']:>8} "
+              f"{row['latency_p50_s']:>7} {row['latency_p90_s']:>7} {row['latency_p99_s']:>7} "
+              f"{row['peak_rss_mb']:>8} {row['final_tmp_bytes'] // 1024:>8} {row['max_leaked_chrome_processes']:>6}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Run History Query
+Answers tuning/capacity questions from the run history archive, reading only the needed columns
+
+Usage:
+    python query_history.py balance --weeks 8                  # HISTORY_S3_BUCKET (deployed runs)
+    python query_history.py failures --weeks 4 --bucket my-state-bucket
+    python query_history.py durations --weeks 12 --percentile 95 --json
+    python query_history.py balance --dir /tmp/lotto-history   # local runs
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-2')
+
+import run_history  # noqa: E402
+from config import KST  # noqa: E402
+
+
+def print_balance(trend: dict):
+    for username, points in trend.items():
+        first, last = points[0][1], points[-1][1]
+        print(f"{username}: {first:,}원 -> {last:,}원 ({last - first:+,}원, {len(points)} samples)")
+        for ts, balance in points:
+            print(f"  {datetime.fromtimestamp(ts, KST):%Y-%m-%d %H:%M}  {balance:>10,}원")
+
+
+def print_failures(stats: dict):
+    print(f"{'step':<16} {'runs':>6} {'failed':>6} {'rate':>7}  failed flow steps")
+    for step, entry in stats.items():
+        details = ', '.join(f"{name} x{count}" for name, count in sorted(entry['failed_steps'].items()))
+        print(f"{step:<16} {entry['runs']:>6} {entry['failures']:>6} {entry['rate'] * 100:>6.1f}%  {details}")
+
+
+def print_durations(stats: dict, pct: int):
+    print(f"{'action':<20} {'runs':>6} {'p50 s':>8} {f'p{pct} s':>8} {'max s':>8}")
+    for action, entry in stats.items():
+        print(f"{action:<20} {entry['runs']:>6} {entry['p50_s']:>8} {entry[f'p{pct}_s']:>8} {entry['max_s']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the lotto automation run history')
+    parser.add_argument('query', choices=('balance', 'failures', 'durations'),
+                        help='balance: trend per account, failures: failure rate per step, '
+                             'durations: run duration percentiles per action')
+    parser.add_argument('--weeks', type=int, default=4, help='Number of most recent weeks to scan')
+    parser.add_argument('--percentile', type=int, default=95, help='Percentile for durations')
+    parser.add_argument('--bucket', default=os.environ.get('HISTORY_S3_BUCKET'),
+                        help='S3 bucket of the deployed function (default: HISTORY_S3_BUCKET; ranged reads of the needed columns)')
+    parser.add_argument('--dir', help=f"Read a local history directory instead (e.g., {run_history.HISTORY_DIR})")
+    parser.add_argument('--json', action='store_true', help='Print JSON instead of a table')
+    args = parser.parse_args()
+
+    if args.dir or not args.bucket:
+        source = run_history.LocalSource(args.dir or run_history.HISTORY_DIR)
+    else:
+        source = run_history.S3Source(args.bucket)
+
+    if args.query == 'balance':
+        result = run_history.balance_trend(source, args.weeks)
+    elif args.query == 'failures':
+        result = run_history.failure_rate_by_step(source, args.weeks)
+    else:
+        result = run_history.duration_by_action(source, args.weeks, args.percentile)
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    elif not result:
+        print(f"No runs in the last {args.weeks} weeks")
+    elif args.query == 'balance':
+        print_balance(result)
+    elif args.query == 'failures':
+        print_failures(result)
+    else:
+        print_durations(result, args.percentile)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+"""
+Local Runner
+Calls handler.lambda_handler from the command line with optional CPU, allocation and RSS profiling
+
+Usage:
+    python run_local.py --action check_balance --fake-site --credentials accounts.json --profile cprofile
+    python run_local.py --event event.json --accounts id1,id2 --profile sample --tracemalloc --rss
+
+Without --credentials the accounts are read from Secrets Manager (SECRET_NAME).
+One report per action is written to --report-dir:
+    <action>-<timestamp>.json     summary (response, duration, RSS peaks, top allocations)
+    <action>-<timestamp>.prof     cProfile stats (--profile cprofile, open with pstats/snakeviz)
+    <action>-<timestamp>.folded   collapsed stacks (--profile sample, open with flamegraph.pl/speedscope)
+    <action>-<timestamp>.txt      top functions of the CPU profile
+"""
+import io
+import os
+import sys
+import json
+import time
+import pstats
+import argparse
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-2')
+
+import fake_site  # noqa: E402
+import fake_secrets  # noqa: E402
+from load_test import FakeContext  # noqa: E402
+from resources import read_processes  # noqa: E402
+
+TOP_N = 30
+
+
+def process_group(name: str) -> str:
+    """Group a process name for RSS reporting"""
+    if name.startswith('chromedriver'):
+        return 'chromedriver'
+    if name.startswith('chrome'):
+        return 'chrome'
+    return 'other'
+
+
+class ChildRssSampler(threading.Thread):
+    """Background sampler tracking RSS of this process and its children, grouped by name"""
+
+    def __init__(self, interval: float = 0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_total_kb = 0
+        self.peak_kb = Counter()
+        self.peak_processes = Counter()
+        self._stop_event = threading.Event()
+
+    def sample(self):
+        root = os.getpid()
+        processes = read_processes()
+        children = {}
+        for pid, (_, _, ppid, _) in processes.items():
+            children.setdefault(ppid, []).append(pid)
+
+        rss = Counter()
+        counts = Counter()
+        stack = list(children.get(root, []))
+        while stack:
+            pid = stack.pop()
+            group = process_group(processes[pid][0])
+            rss[group] += processes[pid][3]
+            counts[group] += 1
+            stack.extend(children.get(pid, []))
+        rss['python'] = processes.get(root, ('', '', 0, 0))[3]
+
+        self.peak_total_kb = max(self.peak_total_kb, sum(rss.values()))
+        for group, value in rss.items():
+            self.peak_kb[group] = max(self.peak_kb[group], value)
+        for group, value in counts.items():
+            self.peak_processes[group] = max(self.peak_processes[group], value)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> dict:
+        self._stop_event.set()
+        self.join()
+        return {
+            'peak_total_mb': round(self.peak_total_kb / 1024, 1),
+            'peak_mb': {group: round(value / 1024, 1) for group, value in sorted(self.peak_kb.items())},
+            'peak_processes': dict(sorted(self.peak_processes.items())),
+        }
+
+
+class SamplingProfiler(threading.Thread):
+    """
+    Statistical profiler sampling the stacks of all threads
+
+    Unlike cProfile it also sees the worker threads of MAX_CONCURRENT_ACCOUNTS
+    and adds little overhead to the time spent waiting on Chrome.
+    """
+
+    def __init__(self, interval: float = 0.005, ignore: tuple = ()):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.ignore = set(ignore)
+        self.stacks = Counter()
+        self.self_counts = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        self.ignore.add(threading.get_ident())
+        while not self._stop_event.is_set():
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in self.ignore:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.self_counts[stack[0]] += 1
+            self.samples += 1
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write(self, folded_path: str, text_path: str):
+        with open(folded_path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        total = sum(self.self_counts.values()) or 1
+        with open(text_path, 'w') as f:
+            f.write(f"{self.samples} samples every {self.interval * 1000:.1f} ms (all threads)\n\n")
+            f.write(f"{'self %':>7} {'samples':>8}  function\n")
+            for function, count in self.self_counts.most_common(TOP_N):
+                f.write(f"{count / total * 100:>7.1f} {count:>8}  {function}\n")
+
+
+def top_allocations(start, end) -> list:
+    """Largest allocation growth between two tracemalloc snapshots"""
+    return [
+        {
+            'location': str(stat.traceback[0]),
+            'size_kb': round(stat.size / 1024, 1),
+            'size_diff_kb': round(stat.size_diff / 1024, 1),
+            'count_diff': stat.count_diff,
+        }
+        for stat in end.compare_to(start, 'lineno')[:TOP_N]
+    ]
+
+
+def load_event(path: str) -> dict:
+    if path == '-':
+        return json.load(sys.stdin)
+    with open(path) as f:
+        return json.load(f)
+
+
+def install_credentials(secret_name: str, path: str):
+    """Serve a local secret file (same format as the Secrets Manager secret) in-process"""
+    import secrets_manager
+
+    with open(path) as f:
+        secret = json.load(f)
+    secrets = {secret_name: secret}
+    # Per-account secrets may be inlined as {"secrets": {"<secret id>": {...}}}
+    secrets.update(secret.pop('secrets', {}))
+    secrets_manager.set_secrets_client(fake_secrets.InMemorySecretsClient(secrets))
+
+
+def run_action(handler, event: dict, args, report_dir: str) -> dict:
+    """Invoke the handler once for an event with the selected profilers"""
+    action = event.get('action', 'buy_ticket')
+    stem = os.path.join(report_dir, f"{action}-{time.strftime('%Y%m%dT%H%M%S')}")
+    report = {'action': action, 'event': event}
+
+    rss_sampler = ChildRssSampler() if args.rss else None
+    profiler = cProfile.Profile() if args.profile == 'cprofile' else None
+
+    if args.tracemalloc:
+        tracemalloc.start(args.tracemalloc_frames)
+        start_snapshot = tracemalloc.take_snapshot()
+    if rss_sampler:
+        rss_sampler.start()
+    sampler = None
+    if args.profile == 'sample':
+        sampler = SamplingProfiler(args.sample_interval, ignore=(rss_sampler.ident,) if rss_sampler else ())
+        sampler.start()
+
+    started = time.time()
+    if profiler:
+        profiler.enable()
+    try:
+        response = handler.lambda_handler(event, FakeContext(f"local-{action}-{int(started)}"))
+    finally:
+        if profiler:
+            profiler.disable()
+        report['duration_s'] = round(time.time() - started, 2)
+        if sampler:
+            sampler.stop()
+        if rss_sampler:
+            report['rss'] = rss_sampler.stop()
+        if args.tracemalloc:
+            end_snapshot = tracemalloc.take_snapshot()
+            report['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+            report['top_allocations'] = top_allocations(start_snapshot, end_snapshot)
+            tracemalloc.stop()
+
+    report['status_code'] = response['statusCode']
+    report['response'] = json.loads(response['body'])
+
+    if profiler:
+        profiler.dump_stats(stem + '.prof')
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(TOP_N)
+        with open(stem + '.txt', 'w') as f:
+            f.write(output.getvalue())
+        report['profile'] = stem + '.prof'
+    if sampler:
+        sampler.write(stem + '.folded', stem + '.txt')
+        report['profile'] = stem + '.folded'
+
+    with open(stem + '.json', 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    report['report'] = stem + '.json'
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run lambda_handler locally with optional profiling')
+    parser.add_argument('--event', help="Event JSON file ('-' for stdin)")
+    parser.add_argument('--action', action='append',
+                        help='Action to run, overrides the event action (repeat for several actions)')
+    parser.add_argument('--accounts', help='Comma-separated usernames to process (default: all)')
+    parser.add_argument('--credentials', help='Local secret JSON file instead of Secrets Manager')
+    parser.add_argument('--fake-site', action='store_true', help='Start the local site stand-in')
+    parser.add_argument('--latency', type=int, default=0, help='Per-request delay of the started stand-in (ms)')
+    parser.add_argument('--site-url', help='Point all page loads at this base URL (e.g., a running stand-in)')
+    parser.add_argument('--notify', action='store_true', help='Keep SNS_TOPIC_ARN and send the digest')
+    parser.add_argument('--profile', choices=('cprofile', 'sample'), help='CPU profiler')
+    parser.add_argument('--sample-interval', type=float, default=0.005, help='Sampling profiler interval (s)')
+    parser.add_argument('--tracemalloc', action='store_true', help='Report allocation growth by line')
+    parser.add_argument('--tracemalloc-frames', type=int, default=1, help='Frames kept per allocation')
+    parser.add_argument('--rss', action='store_true', help='Track RSS of Python, Chrome and ChromeDriver')
+    parser.add_argument('--report-dir', default='profiles', help='Directory for per-action reports')
+    args = parser.parse_args()
+
+    event = load_event(args.event) if args.event else {}
+    actions = args.action or [event.get('action', 'buy_ticket')]
+    if args.accounts:
+        event['usernames'] = [u.strip() for u in args.accounts.split(',') if u.strip()]
+
+    server = None
+    if args.fake_site:
+        server = fake_site.start_server(latency_ms=args.latency)
+        os.environ['SITE_URL_OVERRIDE'] = f'http://127.0.0.1:{server.server_port}'
+    elif args.site_url:
+        os.environ['SITE_URL_OVERRIDE'] = args.site_url
+
+    if args.credentials:
+        os.environ.setdefault('SECRET_NAME', 'lotto-automation/local')
+        install_credentials(os.environ['SECRET_NAME'], args.credentials)
+    if not args.notify:
+        os.environ.pop('SNS_TOPIC_ARN', None)
+
+    import handler
+
+    os.makedirs(args.report_dir, exist_ok=True)
+    print(f"Site: {os.environ.get('SITE_URL_OVERRIDE', 'https://www.dhlottery.co.kr')}", flush=True)
+    try:
+        for action in actions:
+            print(f"Running {action}...", flush=True)
+            report = run_action(handler, dict(event, action=action), args, args.report_dir)
+            body = report['response']
+            errors = body.get('errors') or ([body['error']] if body.get('error') else [])
+            print(f"  status {report['status_code']} in {report['duration_s']}s, {len(errors)} errors", flush=True)
+            for error in errors:
+                print(f"    {error}")
+            if 'rss' in report:
+                print(f"  peak RSS {report['rss']['peak_total_mb']} MB {report['rss']['peak_mb']}")
+            if 'peak_traced_mb' in report:
+                print(f"  peak traced Python memory {report['peak_traced_mb']} MB")
+            print(f"  report: {report['report']}")
+    finally:
+        if server:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
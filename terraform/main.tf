@@ -21,6 +21,14 @@ module "notifications" {
   notification_email = var.notification_email
 }
 
+# Storage Module (S3 state bucket)
+module "storage" {
+  source = "./modules/storage"
+
+  project_name = var.project_name
+  environment  = var.environment
+}
+
 # Lambda Module
 module "lambda" {
   source = "./modules/lambda"
@@ -35,6 +43,9 @@ module "lambda" {
   secret_name   = module.secrets.secret_name
   sns_topic_arn = module.notifications.sns_topic_arn
   dlq_arn       = module.notifications.dlq_arn
+
+  state_bucket_name = module.storage.bucket_name
+  state_bucket_arn  = module.storage.bucket_arn
 }
 
 # EventBridge Module
@@ -44,6 +55,8 @@ module "eventbridge" {
   project_name         = var.project_name
   environment          = var.environment
   schedule_expression  = var.schedule_expression
+  prewarm_schedule     = var.prewarm_schedule_expression
+  prewarm_login        = var.prewarm_login
   lambda_function_arn  = module.lambda.function_arn
   lambda_function_name = module.lambda.function_name
 }
@@ -23,3 +23,30 @@ resource "aws_cloudwatch_event_target" "lambda" {
     action = "buy_ticket"
   })
 }
+
+# Prewarm Rule (readies the container shortly before the scheduled run)
+resource "aws_cloudwatch_event_rule" "prewarm" {
+  count = var.prewarm_schedule == "" ? 0 : 1
+
+  name                = "${var.project_name}-prewarm-${var.environment}"
+  description         = "Prewarm lotto automation before the scheduled run"
+  schedule_expression = var.prewarm_schedule
+
+  tags = {
+    Name        = "${var.project_name}-prewarm"
+    Environment = var.environment
+  }
+}
+
+resource "aws_cloudwatch_event_target" "prewarm" {
+  count = var.prewarm_schedule == "" ? 0 : 1
+
+  rule      = aws_cloudwatch_event_rule.prewarm[0].name
+  target_id = "${var.project_name}-prewarm-target"
+  arn       = var.lambda_function_arn
+
+  input = jsonencode({
+    action = "prewarm"
+    login  = var.prewarm_login
+  })
+}
@@ -13,6 +13,18 @@ variable "schedule_expression" {
   type        = string
 }
 
+variable "prewarm_schedule" {
+  description = "Cron or rate expression for the prewarm action (empty to disable)"
+  type        = string
+  default     = ""
+}
+
+variable "prewarm_login" {
+  description = "Cache a login session per account during prewarm"
+  type        = bool
+  default     = false
+}
+
 variable "lambda_function_arn" {
   description = "ARN of the Lambda function to invoke"
   type        = string
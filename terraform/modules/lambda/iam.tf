@@ -1,5 +1,7 @@
 # IAM Role and Policies for Lambda
 
+data "aws_caller_identity" "current" {}
+
 resource "aws_iam_role" "lambda" {
   name = "${var.project_name}-lambda-role-${var.environment}"
 
@@ -28,7 +30,7 @@ resource "aws_iam_role_policy_attachment" "lambda_basic" {
   policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
 }
 
-# Custom policy for Secrets Manager, SNS, and SQS
+# Custom policy for Secrets Manager, SNS, SQS, and the S3 state bucket
 resource "aws_iam_role_policy" "lambda_custom" {
   name = "${var.project_name}-lambda-policy-${var.environment}"
   role = aws_iam_role.lambda.id
@@ -41,7 +43,19 @@ resource "aws_iam_role_policy" "lambda_custom" {
         Action = [
           "secretsmanager:GetSecretValue"
         ]
-        Resource = var.secret_arn
+        Resource = [
+          var.secret_arn,
+          # Per-account secrets listed in the main secret's "accountSecrets"
+          "arn:aws:secretsmanager:${var.aws_region}:${data.aws_caller_identity.current.account_id}:secret:${var.project_name}/accounts/*"
+        ]
+      },
+      {
+        # BatchGetSecretValue is authorized per call; GetSecretValue still applies per secret
+        Effect = "Allow"
+        Action = [
+          "secretsmanager:BatchGetSecretValue"
+        ]
+        Resource = "*"
       },
       {
         Effect = "Allow"
@@ -56,6 +70,26 @@ resource "aws_iam_role_policy" "lambda_custom" {
           "sqs:SendMessage"
         ]
         Resource = var.dlq_arn
+      },
+      {
+        # Missing keys must read as NoSuchKey (not AccessDenied) for new accounts
+        Effect = "Allow"
+        Action = [
+          "s3:ListBucket"
+        ]
+        Resource = var.state_bucket_arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+          "s3:PutObject"
+        ]
+        Resource = [
+          "${var.state_bucket_arn}/tickets/*",
+          "${var.state_bucket_arn}/notifications/*",
+          "${var.state_bucket_arn}/history/*"
+        ]
       }
     ]
   })
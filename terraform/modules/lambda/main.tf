@@ -48,9 +48,23 @@ resource "aws_ecr_lifecycle_policy" "lambda" {
 resource "null_resource" "docker_build" {
   triggers = {
     dockerfile_hash = filemd5("${local.lambda_dir}/Dockerfile")
+    browser_hash    = filemd5("${local.lambda_dir}/src/browser_pool.py")
+    config_hash     = filemd5("${local.lambda_dir}/src/config.py")
+    draws_hash      = filemd5("${local.lambda_dir}/src/draw_results.py")
+    flows_hash      = filemd5("${local.lambda_dir}/src/flows.py")
     handler_hash    = filemd5("${local.lambda_dir}/src/handler.py")
     lotto_hash      = filemd5("${local.lambda_dir}/src/lotto.py")
+    notify_hash     = filemd5("${local.lambda_dir}/src/notifications.py")
+    pension_hash    = filemd5("${local.lambda_dir}/src/pension_planner.py")
+    resources_hash  = filemd5("${local.lambda_dir}/src/resources.py")
+    history_hash    = filemd5("${local.lambda_dir}/src/run_history.py")
     secrets_hash    = filemd5("${local.lambda_dir}/src/secrets_manager.py")
+    selectors_hash  = filemd5("${local.lambda_dir}/src/selector_registry.py")
+    session_hash    = filemd5("${local.lambda_dir}/src/session_cache.py")
+    state_hash      = filemd5("${local.lambda_dir}/src/state_store.py")
+    tickets_hash    = filemd5("${local.lambda_dir}/src/ticket_store.py")
+    throttle_hash   = filemd5("${local.lambda_dir}/src/throttle.py")
+    tracing_hash    = filemd5("${local.lambda_dir}/src/tracing.py")
     requirements    = filemd5("${local.lambda_dir}/requirements.txt")
   }
 
@@ -89,8 +103,11 @@ resource "aws_lambda_function" "main" {
 
   environment {
     variables = {
-      SNS_TOPIC_ARN = var.sns_topic_arn
-      SECRET_NAME   = var.secret_name
+      SNS_TOPIC_ARN             = var.sns_topic_arn
+      SECRET_NAME               = var.secret_name
+      TICKET_STORE_BUCKET       = var.state_bucket_name
+      NOTIFICATION_STATE_BUCKET = var.state_bucket_name
+      HISTORY_S3_BUCKET         = var.state_bucket_name
     }
   }
 
@@ -50,3 +50,13 @@ variable "dlq_arn" {
   description = "ARN of SQS DLQ"
   type        = string
 }
+
+variable "state_bucket_name" {
+  description = "Name of the S3 bucket for state kept across cold starts"
+  type        = string
+}
+
+variable "state_bucket_arn" {
+  description = "ARN of the S3 bucket for state kept across cold starts"
+  type        = string
+}
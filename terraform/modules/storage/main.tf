@@ -0,0 +1,33 @@
+# Storage Module
+# S3 bucket for state that must survive Lambda cold starts (/tmp is per container)
+
+data "aws_caller_identity" "current" {}
+
+resource "aws_s3_bucket" "state" {
+  bucket        = "${var.project_name}-state-${var.environment}-${data.aws_caller_identity.current.account_id}"
+  force_destroy = true
+
+  tags = {
+    Name        = "${var.project_name}-state"
+    Environment = var.environment
+  }
+}
+
+resource "aws_s3_bucket_public_access_block" "state" {
+  bucket = aws_s3_bucket.state.id
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_s3_bucket_server_side_encryption_configuration" "state" {
+  bucket = aws_s3_bucket.state.id
+
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+  }
+}
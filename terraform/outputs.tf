@@ -27,3 +27,8 @@ output "secret_name" {
   description = "Name of the credentials secret"
   value       = module.secrets.secret_name
 }
+
+output "state_bucket_name" {
+  description = "Name of the S3 bucket with state kept across cold starts"
+  value       = module.storage.bucket_name
+}
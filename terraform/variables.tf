@@ -28,6 +28,18 @@ variable "schedule_expression" {
   default     = "cron(0 6 ? * MON *)" # Every Monday at 15:00 KST (06:00 UTC)
 }
 
+variable "prewarm_schedule_expression" {
+  description = "EventBridge schedule for the prewarm action (empty to disable)"
+  type        = string
+  default     = "cron(57 5 ? * MON *)" # 3 minutes before the scheduled run
+}
+
+variable "prewarm_login" {
+  description = "Cache a login session per account during prewarm"
+  type        = bool
+  default     = true
+}
+
 variable "lambda_timeout" {
   description = "Lambda function timeout in seconds"
   type        = number